@@ -2,7 +2,7 @@ from hask.lang import build_instance
 from hask.lang import List
 from hask.lang import instance
 from hask.Data.Functor import Functor
-from hask.lang import sig, constraint, H, t, L
+from hask.lang import sig, constraint, dispatch, H, t, L
 from hask.lang.infix import Infix
 from hask.lang.type_vars import *
 
@@ -28,6 +28,7 @@ class Applicative(Functor):
         build_instance(Applicative, cls, {"pure":pure, "ap":ap})
         return
 
+@dispatch(Applicative, "ap", 1)
 @constraint(Applicative(f))
 def appAp(fn : f(a >> b), x : f(a)) -> f(b):
     """
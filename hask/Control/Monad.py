@@ -1,6 +1,7 @@
 import itertools
 
 from hask.lang import sig
+from hask.lang import dispatch
 from hask.lang import H
 from hask.lang import t
 from hask.lang import L
@@ -49,6 +50,7 @@ def bind(m, fn):
     return Monad[m].bind(m, fn)
 
 
+@dispatch(Monad, "bind")
 @sig(H[(Monad, "m")]/ t("m", "a") >> (H/ "a" >> t("m", "b")) >> t("m", "b"))
 def mbind(m, fn):
     """
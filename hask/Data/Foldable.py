@@ -1,7 +1,7 @@
 import functools
 import operator
 
-from hask.lang import sig, annotated, constraint
+from hask.lang import sig, annotated, constraint, dispatch
 from hask.lang import H
 from hask.lang import t
 from hask.lang import L
@@ -76,6 +76,7 @@ class Foldable(Typeclass):
         return
 
 
+@dispatch(Foldable, "foldr", 2)
 @constraint(Foldable(r))
 def foldr(f : a >> b >> b, z : b, t : r(a)) -> b:
     """
@@ -97,6 +98,7 @@ def foldr1(f : a >> a >> a, t : r(a)) -> a:
     return Foldable[t].foldr(f, t)
 
 
+@dispatch(Foldable, "foldl", 2)
 @constraint(Foldable(r))
 def foldl(f : a >> a >> b, z : b, t : r(a)) -> b:
     """
@@ -107,6 +109,7 @@ def foldl(f : a >> a >> b, z : b, t : r(a)) -> b:
     return Foldable[t].foldl(f, z, t)
 
 
+@dispatch(Foldable, "foldl_", 2)
 @constraint(Foldable(r))
 def foldl_(f : a >> a >> b, z : b, t : r(a)) -> b:
     """
@@ -129,6 +132,7 @@ def foldl1(f : a >> a >> a, t : r(a)) -> a:
     Foldable[t].foldl1(f, t)
 
 
+@dispatch(Foldable, "toList")
 @constraint(Foldable(r))
 def toList(t : r(a)) -> [a]:
     """
@@ -139,6 +143,7 @@ def toList(t : r(a)) -> [a]:
     return Foldable[t].toList(t)
 
 
+@dispatch(Foldable, "null")
 @constraint(Foldable(r))
 def null(t : r(a)) -> bool:
     """
@@ -150,6 +155,7 @@ def null(t : r(a)) -> bool:
     return Foldable[t].null(t)
 
 
+@dispatch(Foldable, "length")
 @constraint(Foldable(r))
 def length(t : r(a)) -> int:
     """
@@ -170,6 +176,7 @@ def elem(x : a, t : r(a)) -> bool:
     return Foldable[t].elem(t)
 
 
+@dispatch(Foldable, "maximum")
 @constraint(Foldable(r), Ord(a))
 def maximum(t : r(a)) -> a:
     """
@@ -180,6 +187,7 @@ def maximum(t : r(a)) -> a:
     return Foldable[t].maximum(t)
 
 
+@dispatch(Foldable, "minimum")
 @constraint(Foldable(r), Ord(a))
 def minimum(t : r(a)) -> a:
     """
@@ -190,6 +198,7 @@ def minimum(t : r(a)) -> a:
     return Foldable[t].minimum(t)
 
 
+@dispatch(Foldable, "sum")
 @constraint(Foldable(t), Num(a))
 def sum(t : r(a)) -> a:
     """
@@ -200,6 +209,7 @@ def sum(t : r(a)) -> a:
     return Foldable[t].sum(t)
 
 
+@dispatch(Foldable, "product")
 @constraint(Foldable(t), Num(a))
 def product(t : r(a)) -> a:
     """
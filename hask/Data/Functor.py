@@ -1,6 +1,6 @@
 from hask.lang import TypedFunc, Typeclass, is_builtin
 from hask.lang import build_instance, List
-from hask.lang import L, H, sig, constraint, t
+from hask.lang import L, H, sig, constraint, dispatch, bulk, t
 from hask.lang import instance, deriving, Show, data, d
 from hask.Data.Function import const, comp
 from hask.Data.Unit import Unit, Star
@@ -41,6 +41,7 @@ def map(f, x):
     """
     return Functor[x].fmap(f, x)
 
+@dispatch(Functor, "fmap", 1)
 @constraint(Functor(f))
 def fmap(fn : a >> b, x : f(a)) -> f(b):
     """
@@ -55,7 +56,8 @@ def void(x : f(a)) -> f(Unit):
     return fmap(const(Star), x)
 
 instance(Functor, List).where(
-    fmap = lambda fn, lst: L[builtins.map(fn, builtins.iter(lst))]
+    fmap = lambda fn, lst: lst.derive(builtins.map(bulk(fn),
+                                                   builtins.iter(lst)))
 )
 
 instance(Functor, TypedFunc).where(
@@ -5,12 +5,15 @@ import builtins
 
 from hask.lang import H
 from hask.lang import sig
+from hask.lang import bulk
 from hask.lang import t
 from hask.lang import L
 from hask.lang import __
 from hask.lang import caseof
 from hask.lang import m
 from hask.lang import p
+from hask.lang.backend import vmap, vfilter, vfoldl, vscanl
+from hask.lang.backend import vsum, vproduct, vsort
 
 from .Eq import Eq
 from .Ord import Ord
@@ -103,6 +106,10 @@ def length(xs):
     implementation is optimized for structures that are similar to cons-lists,
     because there is no general way to do better.
     """
+    if xs.window is not None:
+        # the length of a List with a window is only known once it has been
+        # evaluated, so count its elements as they stream past
+        return builtins.sum(1 for _ in xs)
     return len(xs)
 
 
@@ -117,7 +124,10 @@ def map(f, xs):
 
     map(f, xs) is the list obtained by applying f to each element of xs
     """
-    return L[builtins.map(f, xs)]
+    ys = vmap(f, xs)
+    if ys is not None:
+        return ys
+    return xs.derive(builtins.map(bulk(f), xs))
 
 
 @sig(H/ ["a"] >> ["a"] )
@@ -211,7 +221,10 @@ def foldl(f, z, xs):
     left-identity of the operator), and a list, reduces the list using the
     binary operator, from left to right. The list must be finite.
     """
-    return functools.reduce(f, xs, z)
+    r = vfoldl(f, z, xs)
+    if r is not None:
+        return r
+    return functools.reduce(bulk(f), xs, z)
 
 
 @sig(H/ (H/ "b" >> "a" >> "b") >> "a" >> ["a"] >> "b")
@@ -285,7 +298,7 @@ def concat(xss):
         for xs in xss:
             for x in xs:
                 yield x
-    return L[__concat(xss)]
+    return xss.derive(__concat(xss))
 
 
 @sig(H/ (H/ "a" >> ["b"]) >> ["a"] >> ["b"])
@@ -332,6 +345,7 @@ def any(p, xs):
     finite; True, however, results from a True value for the predicate applied
     to an element at a finite index of a finite or infinite list.
     """
+    p = bulk(p)
     return True in ((p(x) for x in xs))
 
 
@@ -345,6 +359,7 @@ def all(p, xs):
     finite; False, however, results from a False value for the predicate
     applied to an element at a finite index of a finite or infinite list.
     """
+    p = bulk(p)
     return False not in ((p(x) for x in xs))
 
 
@@ -355,7 +370,14 @@ def sum(xs):
 
     The sum function computes the sum of a finite list of numbers.
     """
-    return functools.reduce(operator.add, xs, 0)
+    r = vsum(xs)
+    if r is not None:
+        return r
+    packed = xs.buffer()
+    if packed is not None and packed.typecode == "q":
+        # exact for machine ints, and adds them without boxing each one
+        return builtins.sum(packed)
+    return functools.reduce(operator.add, xs if packed is None else packed, 0)
 
 
 @sig(H[(Num, "a")]/ ["a"] >> "a")
@@ -365,6 +387,9 @@ def product(xs):
 
     The product function computes the product of a finite list of numbers.
     """
+    r = vproduct(xs)
+    if r is not None:
+        return r
     return functools.reduce(operator.mul, xs, 1)
 
 
@@ -377,7 +402,7 @@ def minimum(xs):
     finite, and of an ordered type. It is a special case of minimumBy, which
     allows the programmer to supply their own comparison function.
     """
-    return min(xs)
+    return min(xs.buffer() or xs)
 
 
 @sig(H[(Ord, "a")]/ ["a"] >> "a")
@@ -389,7 +414,7 @@ def maximum(xs):
     finite, and of an ordered type. It is a special case of maximumBy, which
     allows the programmer to supply their own comparison function.
     """
-    return max(xs)
+    return max(xs.buffer() or xs)
 
 
 #=============================================================================#
@@ -404,7 +429,10 @@ def scanl(f, z, xs):
     scanl is similar to foldl, but returns a list of successive reduced values
     from the left
     """
-    raise NotImplementedError()
+    ys = vscanl(f, z, xs)
+    if ys is not None:
+        return ys
+    return xs.derive(itertools.accumulate(itertools.chain([z], xs), bulk(f)))
 
 
 @sig(H/ (H/ "a" >> "a" >> "a") >> ["a"] >> ["a"])
@@ -414,7 +442,7 @@ def scanl1(f, xs):
 
     scanl1 is a variant of scanl that has no starting value argument
     """
-    return L[itertools.accumulate(xs, f)]
+    return xs.derive(itertools.accumulate(xs, bulk(f)))
 
 
 @sig(H/ (H/ "a" >> "a" >> "b") >> "b" >> ["a"] >> ["b"])
@@ -481,7 +509,7 @@ def iterate(f, x):
         while True:
             yield x
             x = f(x)
-    return L[__iterate(f, x)]
+    return L[__iterate(bulk(f), x)]
 
 
 @sig(H/ "a" >> ["a"])
@@ -591,7 +619,7 @@ def takeWhile(p, xs):
     takeWhile, applied to a predicate p and a list xs, returns the longest
     prefix (possibly empty) of xs of elements that satisfy p
     """
-    return L[itertools.takewhile(p, xs)]
+    return xs.derive(itertools.takewhile(bulk(p), xs))
 
 
 @sig(H/ (H/ "a" >> bool) >> ["a"] >> ["a"])
@@ -601,7 +629,7 @@ def dropWhile(p, xs):
 
     dropWhile(p, xs) returns the suffix remaining after takeWhile(p, xs)
     """
-    return L[itertools.dropwhile(p, xs)]
+    return xs.derive(itertools.dropwhile(bulk(p), xs))
 
 
 @sig(H/ (H/ "a" >> bool) >> ["a"] >> ["a"])
@@ -780,10 +808,8 @@ def lookup(key, assocs):
 
     lookup(key, assocs) looks up a key in an association list.
     """
-    for k, value in assocs:
-        if k == key:
-            return Just(value)
-    return Nothing
+    i = assocs.position(key, keyed=True)
+    return Nothing if i is None else Just(assocs[i][1])
 
 
 #=============================================================================#
@@ -799,6 +825,7 @@ def find(p, xs):
     leftmost element of the structure matching the predicate, or Nothing if
     there is no such element.
     """
+    p = bulk(p)
     for x in xs:
         if p(x):
             return Just(x)
@@ -813,7 +840,10 @@ def filter(f, xs):
     filter, applied to a predicate and a list, returns the list of those
     elements that satisfy the predicate
     """
-    return L[builtins.filter(f, xs)]
+    ys = vfilter(f, xs)
+    if ys is not None:
+        return ys
+    return xs.derive(builtins.filter(bulk(f), xs))
 
 
 @sig(H/ (H/ "a" >> bool) >> ["a"] >> (["a"], ["a"]))
@@ -825,6 +855,7 @@ def partition(f, xs):
     lists of elements which do and do not satisfy the predicate.
     """
     yes, no = [], []
+    f = bulk(f)
     for item in xs:
         if f(item):
             yes.append(item)
@@ -846,10 +877,8 @@ def elemIndex(x, xs):
     list which is equal (by ==) to the query element, or Nothing if there is no
     such element.
     """
-    for i, a in enumerate(xs):
-        if a == x:
-            return Just(i)
-    return Nothing
+    i = xs.position(x)
+    return Nothing if i is None else Just(i)
 
 
 @sig(H[(Eq, "a")]/ "a" >> ["a"] >> [int])
@@ -901,7 +930,7 @@ def zip(xs, ys):
     zip takes two lists and returns a list of corresponding pairs. If one input
     list is short, excess elements of the longer list are discarded.
     """
-    return L[builtins.zip(xs, ys)]
+    return xs.derive(builtins.zip(xs, ys))
 
 
 @sig(H/ ["a"] >> ["b"] >> ["c"] >> [("a", "b", "c")])
@@ -970,7 +999,11 @@ def zipWith(fn, xs, ys):
     argument, instead of a tupling function. For example, zipWith (+) is
     applied to two lists to produce the list of corresponding sums.
     """
-    return L[(fn(*s) for s in zip(xs, ys))]
+    zs = vmap(fn, xs, ys)
+    if zs is not None:
+        return zs
+    fn = bulk(fn)
+    return xs.derive((fn(*s) for s in zip(xs, ys)))
 
 
 @sig(H/ (H/ "a" >> "b" >> "c" >> "d") >> ["a"] >> ["b"] >> ["c"] >> ["d"])
@@ -982,6 +1015,7 @@ def zipWith3(fn, a, b, c):
     well as three lists and returns a list of their point-wise combination,
     analogous to zipWith.
     """
+    fn = bulk(fn)
     return L[(fn(*s) for s in zip3(a, b, c))]
 
 
@@ -995,6 +1029,7 @@ def zipWith4(fn, a, b, c, d):
     well as four lists and returns a list of their point-wise combination,
     analogous to zipWith.
     """
+    fn = bulk(fn)
     return L[(fn(*s) for s in zip4(a, b, c, d))]
 
 
@@ -1009,6 +1044,7 @@ def zipWith5(fn, a, b, c, d, e):
     well as five lists and returns a list of their point-wise combination,
     analogous to zipWith.
     """
+    fn = bulk(fn)
     return L[(fn(*s) for s in zip5(a, b, c, d, e))]
 
 
@@ -1023,6 +1059,7 @@ def zipWith6(fn, a, b, c, d, e, f):
     as six lists and returns a list of their point-wise combination, analogous
     to zipWith.
     """
+    fn = bulk(fn)
     return L[(fn(*s) for s in zip6(a, b, c, d, e, f))]
 
 
@@ -1037,6 +1074,7 @@ def zipWith7(fn, a, b, c, d, e, f):
     well as seven lists and returns a list of their point-wise combination,
     analogous to zipWith.
     """
+    fn = bulk(fn)
     return L[(fn(*s) for s in zip7(a, b, c, d, e, f))]
 
 
@@ -1228,6 +1266,9 @@ def sort(xs):
 
     Note: Current implementation is not lazy
     """
+    ys = vsort(xs)
+    if ys is not None:
+        return ys
     return L[sorted(xs)]
 
 
@@ -1,6 +1,6 @@
 from hask.lang import Typeclass
 from hask.lang import build_instance
-from hask.lang import H, sig, constraint
+from hask.lang import H, sig, constraint, dispatch
 from hask.lang.type_vars import *
 
 
@@ -22,6 +22,7 @@ class Monoid(Typeclass):
         return
 
 
+@dispatch(Monoid, "mappend")
 @constraint(Monoid(a))
 def mappend(x : a, y : a) -> a:
     """
@@ -3,7 +3,7 @@ import fractions
 import sys
 import builtins
 
-from hask.lang import data, d, deriving, H, sig, t
+from hask.lang import data, d, deriving, H, sig, t, dispatch
 from hask.lang import instance, build_instance
 from hask.lang import Enum, Show
 from .Eq import Eq
@@ -39,6 +39,7 @@ class Num(Show, Eq):
         return
 
 
+@dispatch(Num, "negate")
 @sig(H[(Num, "a")]/ "a" >> "a")
 def negate(a):
     """
@@ -49,6 +50,7 @@ def negate(a):
     return Num[a].negate(a)
 
 
+@dispatch(Num, "signum")
 @sig(H[(Num, "a")]/ "a" >> "a")
 def signum(a):
     """
@@ -62,6 +64,7 @@ def signum(a):
     return Num[a].signum(a)
 
 
+@dispatch(Num, "abs")
 @sig(H[(Num, "a")]/ "a" >> "a")
 def abs(a):
     """
@@ -72,6 +75,7 @@ def abs(a):
     return Num[a].abs(a)
 
 
+@dispatch(Num, "add")
 @sig(H[(Num, "a")]/ "a" >> "a" >> "a")
 def add(a, b):
     """
@@ -82,6 +86,7 @@ def add(a, b):
     return Num[a].add(a, b)
 
 
+@dispatch(Num, "sub")
 @sig(H[(Num, "a")]/ "a" >> "a" >> "a")
 def sub(a, b):
     """
@@ -92,6 +97,7 @@ def sub(a, b):
     return Num[a].sub(a, b)
 
 
+@dispatch(Num, "mul")
 @sig(H[(Num, "a")]/ "a" >> "a" >> "a")
 def mul(a, b):
     """
@@ -185,6 +191,7 @@ instance(Fractional, float).where(
 )
 
 
+@dispatch(Fractional, "recip")
 @sig(H[(Fractional, "a")]/ "a" >> "a")
 def recip(a):
     """
@@ -222,6 +229,7 @@ class Floating(Fractional):
         return
 
 
+@dispatch(Floating, "exp")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def exp(x):
     """
@@ -230,6 +238,7 @@ def exp(x):
     return Floating[x].exp(x)
 
 
+@dispatch(Floating, "sqrt")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def sqrt(x):
     """
@@ -238,6 +247,7 @@ def sqrt(x):
     return Floating[x].sqrt(x)
 
 
+@dispatch(Floating, "log")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def log(x):
     """
@@ -246,6 +256,7 @@ def log(x):
     return Floating[x].log(x)
 
 
+@dispatch(Floating, "pow")
 @sig(H[(Floating, "a")]/ "a" >> "a" >> "a")
 def pow(x, y):
     """
@@ -254,6 +265,7 @@ def pow(x, y):
     return Floating[x].pow(x, y)
 
 
+@dispatch(Floating, "logBase")
 @sig(H[(Floating, "a")]/ "a" >> "a" >> "a")
 def logBase(x, b):
     """
@@ -262,6 +274,7 @@ def logBase(x, b):
     return Floating[x].logBase(x, b)
 
 
+@dispatch(Floating, "sin")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def sin(x):
     """
@@ -270,6 +283,7 @@ def sin(x):
     return Floating[x].sin(x)
 
 
+@dispatch(Floating, "cos")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def cos(x):
     """
@@ -278,6 +292,7 @@ def cos(x):
     return Floating[x].cos(x)
 
 
+@dispatch(Floating, "tan")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def tan(x):
     """
@@ -286,6 +301,7 @@ def tan(x):
     return Floating[x].tan(x)
 
 
+@dispatch(Floating, "asin")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def asin(x):
     """
@@ -294,6 +310,7 @@ def asin(x):
     return Floating[x].asin(x)
 
 
+@dispatch(Floating, "atan")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def atan(x):
     """
@@ -302,6 +319,7 @@ def atan(x):
     return Floating[x].atan(x)
 
 
+@dispatch(Floating, "acos")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def acos(x):
     """
@@ -310,6 +328,7 @@ def acos(x):
     return Floating[x].acos(x)
 
 
+@dispatch(Floating, "sinh")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def sinh(x):
     """
@@ -318,6 +337,7 @@ def sinh(x):
     return Floating[x].sinh(x)
 
 
+@dispatch(Floating, "tanh")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def tanh(x):
     """
@@ -326,6 +346,7 @@ def tanh(x):
     return Floating[x].tanh(x)
 
 
+@dispatch(Floating, "cosh")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def cosh(x):
     """
@@ -334,6 +355,7 @@ def cosh(x):
     return Floating[x].cosh(x)
 
 
+@dispatch(Floating, "asinh")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def asinh(x):
     """
@@ -342,6 +364,7 @@ def asinh(x):
     return Floating[x].asinh(x)
 
 
+@dispatch(Floating, "atanh")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def atanh(x):
     """
@@ -350,6 +373,7 @@ def atanh(x):
     return Floating[x].atanh(x)
 
 
+@dispatch(Floating, "acosh")
 @sig(H[(Floating, "a")]/ "a" >> "a")
 def acosh(x):
     """
@@ -399,6 +423,7 @@ class Real(Num, Ord):
         return
 
 
+@dispatch(Real, "toRational")
 @sig(H[(Real, "a")]/ "a" >> Rational)
 def toRational(x):
     """
@@ -489,6 +514,7 @@ class RealFrac(Real, Fractional):
         return
 
 
+@dispatch(RealFrac, "properFraction")
 @sig(H[(RealFrac, "a"), (Integral, "b")]/ "a" >> ("b", "a"))
 def properFraction(x):
     """
@@ -504,6 +530,7 @@ def properFraction(x):
     return RealFrac[x].properFraction(x)
 
 
+@dispatch(RealFrac, "truncate")
 @sig(H[(RealFrac, "a"), (Integral, "b")]/ "a" >> "b")
 def truncate(x):
     """
@@ -514,6 +541,7 @@ def truncate(x):
     return RealFrac[x].truncate(x)
 
 
+@dispatch(RealFrac, "round")
 @sig(H[(RealFrac, "a"), (Integral, "b")]/ "a" >> "b")
 def round(x):
     """
@@ -525,6 +553,7 @@ def round(x):
     return RealFrac[x].round(x)
 
 
+@dispatch(RealFrac, "ceiling")
 @sig(H[(RealFrac, "a"), (Integral, "b")]/ "a" >> "b")
 def ceiling(x):
     """
@@ -535,6 +564,7 @@ def ceiling(x):
     return RealFrac[x].ceiling(x)
 
 
+@dispatch(RealFrac, "floor")
 @sig(H[(RealFrac, "a"), (Integral, "b")]/ "a" >> "b")
 def floor(x):
     """
@@ -578,6 +608,7 @@ class RealFloat(Floating, RealFrac):
         return
 
 
+@dispatch(RealFloat, "isNan")
 @sig(H[(RealFloat, "a")]/ "a" >> bool)
 def isNaN(x):
     """
@@ -588,6 +619,7 @@ def isNaN(x):
     return RealFloat[x].isNan(x)
 
 
+@dispatch(RealFloat, "isInfinite")
 @sig(H[(RealFloat, "a")]/ "a" >> bool)
 def isInfinite(x):
     """
@@ -598,6 +630,7 @@ def isInfinite(x):
     return RealFloat[x].isInfinite(x)
 
 
+@dispatch(RealFloat, "isNegativeZero")
 @sig(H[(RealFloat, "a")]/ "a" >> bool)
 def isNegativeZero(x):
     """
@@ -608,6 +641,7 @@ def isNegativeZero(x):
     return RealFloat[x].isNegativeZero(x)
 
 
+@dispatch(RealFloat, "atan2", 1)
 @sig(H[(RealFloat, "a")]/ "a" >> "a" >> "a")
 def atan2(y, x):
     """
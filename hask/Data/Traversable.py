@@ -1,5 +1,6 @@
 from hask.lang import build_instance
 from hask.lang import sig
+from hask.lang import dispatch
 from hask.lang import H
 from hask.lang import t
 from hask.Control.Applicative import Applicative
@@ -31,6 +32,7 @@ class Traversable(Foldable, Functor):
         return
 
 
+@dispatch(Traversable, "traverse", 1)
 @sig(H[(Applicative, "f"), (Traversable, "t")]/
         (H/ "a" >> t("f", "b")) >> t("t", "a") >> t("f", t("t", "b")))
 def traverse(f, t):
@@ -45,6 +47,7 @@ def traverse(f, t):
     return Traversable[t].traverse(f, t)
 
 
+@dispatch(Traversable, "sequenceA")
 @sig(H[(Applicative, "f"), (Traversable, "t")]/
         t("t", t("f", "a")) >> t("f", t("t", "a")))
 def sequenceA(t):
@@ -70,6 +73,7 @@ def mapM(f, m):
     return Traversable[t].mapM(f, t)
 
 
+@dispatch(Traversable, "sequence")
 @sig(H[(Monad, "m"), (Traversable, "t")]/
         t("t", t("m", "a")) >> t("m", t("t", "a")))
 def sequence(t):
@@ -57,6 +57,13 @@ from hask.lang import data, d, deriving
 ## Type signatures
 from hask.lang import sig, annotated, constraint, H, t, func, TypeSignatureError
 
+## Runtime type checking levels
+from hask.lang import typecheck, get_typecheck, set_typecheck, TypeProfiler
+from hask.lang import specialize
+
+## Numeric backends
+from hask.lang import get_backend, set_backend
+
 ## Pattern matching
 from hask.lang import caseof, p, m, IncompletePatternError
 
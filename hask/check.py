@@ -0,0 +1,480 @@
+"""
+Ahead-of-time type checker for hask modules.
+
+Usage:
+
+    python -m hask.check module.py [module.py ...]
+    python -m hask.check package.module [...]
+
+Each module is imported, so that its type signatures (sig, annotated and
+constraint) and data declarations (data and ADT) are built exactly as they
+would be at runtime. The bodies of its typed functions are then read from the
+module's source and checked against their signatures with the same
+Hindley-Milner inference that is used on every call at runtime: calls to typed
+functions and data constructors, literals (numeric literals being
+polymorphic, as in Haskell), tuples, lambdas and conditional expressions are
+inferred, and anything else (operators, attributes, untyped
+Python functions) is assumed to have an unknown type. Modules that pass can
+then be run with runtime checks relaxed (see typecheck and HASK_TYPECHECK).
+"""
+import ast
+import importlib.util
+import itertools
+import os
+import sys
+import traceback
+from collections import namedtuple
+
+from hask.lang.hindley_milner import Var
+from hask.lang.hindley_milner import App
+from hask.lang.hindley_milner import Lam
+from hask.lang.hindley_milner import TypeVariable
+from hask.lang.hindley_milner import TypeOperator
+from hask.lang.hindley_milner import TypeScheme
+from hask.lang.hindley_milner import Function
+from hask.lang.hindley_milner import Tuple
+from hask.lang.hindley_milner import analyze
+from hask.lang.hindley_milner import unify
+from hask.lang.hindley_milner import prune
+from hask.lang.type_system import Hask
+from hask.lang.type_system import TypedCallable
+from hask.lang.type_system import TypedFunc
+from hask.lang.type_system import typeof
+from hask.lang.type_system import type_witness
+
+
+#=============================================================================#
+# Diagnostics
+
+
+class Diagnostic(namedtuple("Diagnostic", ("filename", "line", "message"))):
+    """A type error found in a module, in the format filename:line: message"""
+    def __str__(self):
+        return "%s:%d: %s" % self
+
+
+# How the body of a typed function is being checked: the types of its
+# parameters and of the locals assigned so far, the set of non-generic types,
+# the names local to the function, those of them assigned exactly once, and
+# the return type (None at the top level of a module)
+Scope = namedtuple("Scope", ("types", "non_generic", "local", "once", "ret"))
+
+
+# The nodes literals are parsed into: before Python 3.8 these are Num, Str,
+# Bytes and NameConstant rather than Constant
+if sys.version_info >= (3, 8):
+    __literal_nodes__ = (ast.Constant,)
+else:
+    __literal_nodes__ = (ast.Num, ast.Str, ast.Bytes, ast.NameConstant)
+
+
+#=============================================================================#
+# Checking
+
+
+class ModuleChecker(object):
+    """
+    Checks the typed functions and top-level statements of an imported
+    module against its parsed source.
+
+    Attributes:
+        errors: the Diagnostics found so far
+        checked: the number of typed functions whose bodies were checked
+        skipped: the number of typed functions whose parameters could not be
+                 matched up with their signatures (e.g. *args)
+    """
+    def __init__(self, module, tree, filename):
+        self.module = module
+        self.tree = tree
+        self.filename = filename
+        self.errors = []
+        self.checked = 0
+        self.skipped = 0
+        self.__globals = {}
+        self.__names = itertools.count()
+
+    def check(self):
+        """
+        Check the module.
+
+        Returns: The list of Diagnostics found
+        """
+        for node in self.tree.body:
+            if isinstance(node, ast.FunctionDef):
+                fn = getattr(self.module, node.name, None)
+                if isinstance(fn, TypedFunc) and fn.__root__ is None and \
+                        getattr(fn.func, "__name__", None) == node.name:
+                    self.check_function(fn, node.args, node.body, node)
+                continue
+            elif isinstance(node, (ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+
+            lam = self.__typed_lambda(node)
+            if lam is not None:
+                fn, args, body = lam
+                ret = ast.copy_location(ast.Return(value=body), body)
+                self.check_function(fn, args, [ret], node)
+            else:
+                self.__statements([node], Scope({}, set(), set(), set(), None))
+        return self.errors
+
+    def check_function(self, fn, arguments, body, node):
+        """
+        Check the body of a typed function against its signature.
+
+        Args:
+            fn: the TypedFunc
+            arguments: the ast.arguments of the function
+            body: the list of statements making up the body of the function
+            node: the node defining the function, for error reporting
+        """
+        # ast.arguments has no posonlyargs before Python 3.8
+        posonlyargs = getattr(arguments, "posonlyargs", [])
+        params = [a.arg for a in posonlyargs + arguments.args]
+        if arguments.vararg or arguments.kwarg or arguments.kwonlyargs or \
+                len(params) != len(fn.fn_args) - 1:
+            self.skipped += 1
+            return
+        self.checked += 1
+
+        fn_type = TypeScheme(fn.fn_type).instantiate()
+        rigid = self.__variables(fn_type)
+        types = {}
+        ret = fn_type
+        for name in params:
+            ret = prune(ret)
+            types[name] = ret.types[0]
+            ret = ret.types[1]
+
+        assigned = [n.id for stmt in body for n in ast.walk(stmt)
+                    if isinstance(n, ast.Name) and
+                    isinstance(n.ctx, (ast.Store, ast.Del))]
+        once = set(n for n in assigned if assigned.count(n) == 1)
+        scope = Scope(types, set(types.values()), set(assigned) | set(params),
+                      once - set(params), ret)
+        self.__statements(body, scope)
+
+        # type variables in a signature are rigid: the body may not force
+        # them to a particular type, or to be the same as one another
+        seen = set()
+        for v in rigid:
+            p = prune(v)
+            if not isinstance(p, TypeVariable) or p in seen:
+                TypeVariable.reset_names()
+                self.__error(node, "{0} is less polymorphic than its "
+                             "signature {1}".format(fn.func.__name__,
+                                                    fn.fn_type))
+                break
+            seen.add(p)
+
+    #-------------------------------------------------------------------------#
+    # Statements
+
+    def __statements(self, body, scope):
+        for stmt in body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef,
+                                 ast.ClassDef)):
+                continue
+            elif isinstance(stmt, ast.Return):
+                if stmt.value is None or scope.ret is None:
+                    continue
+                t = self.__infer(stmt.value, scope)
+                if t is not None:
+                    try:
+                        unify(scope.ret, t)
+                    except TypeError as e:
+                        self.__error(stmt, "In return value: %s" % e)
+                continue
+            elif self.__assigns_once(stmt, scope):
+                t = self.__infer(stmt.value, scope)
+                if t is not None:
+                    scope.types[stmt.targets[0].id] = t
+                continue
+
+            for child in ast.iter_child_nodes(stmt):
+                if isinstance(child, ast.expr):
+                    self.__infer(child, scope)
+                elif isinstance(child, ast.withitem):
+                    self.__infer(child.context_expr, scope)
+            for field in ("body", "orelse", "finalbody"):
+                self.__statements(getattr(stmt, field, []), scope)
+            for handler in getattr(stmt, "handlers", []):
+                self.__statements(handler.body, scope)
+
+    def __assigns_once(self, stmt, scope):
+        """
+        Whether stmt gives a local its only value in the function, so that the
+        local can be given the type of that value.
+        """
+        return isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and \
+            isinstance(stmt.targets[0], ast.Name) and \
+            stmt.targets[0].id in scope.once
+
+    #-------------------------------------------------------------------------#
+    # Expressions
+
+    def __infer(self, node, scope):
+        """
+        Infer the type of an expression, reporting any type error.
+
+        Returns: The type, or None if the expression is ill-typed
+        """
+        env = dict(scope.types)
+        term = self.__term(node, scope, env, frozenset(), frozenset())
+        try:
+            return analyze(term, env, scope.non_generic)
+        except TypeError as e:
+            self.__error(node, str(e))
+            return None
+
+    def __term(self, node, scope, env, bound, shadowed):
+        """
+        Translate a Python expression into the expression language of the
+        type inferencer, adding the types of the names it uses to env.
+
+        Args:
+            node: the expression
+            scope: the Scope of the enclosing function
+            env: the type environment being built
+            bound: the parameters of the enclosing lambdas
+            shadowed: names bound by enclosing comprehensions
+        """
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in bound:
+                return Var(name)
+            elif name in shadowed:
+                return self.__unknown(env)
+            elif name in scope.types:
+                return Var(name)
+            elif name not in scope.local:
+                t = self.__global(name)
+                if t is not None:
+                    env[name] = t
+                    return Var(name)
+            return self.__unknown(env)
+
+        elif isinstance(node, __literal_nodes__):
+            # numeric literals are polymorphic, as in Haskell
+            value = ast.literal_eval(node)
+            if type(value) in (int, float, complex):
+                return self.__unknown(env)
+            elif not callable(value) and type_witness(value) is not None:
+                return self.__literal(env, typeof(value))
+
+        elif isinstance(node, ast.Call) and node.args and \
+                not node.keywords and \
+                not any(isinstance(a, ast.Starred) for a in node.args):
+            term = self.__term(node.func, scope, env, bound, shadowed)
+            for arg in node.args:
+                term = App(term, self.__term(arg, scope, env, bound, shadowed))
+            return term
+
+        elif isinstance(node, ast.Lambda) and self.__simple(node.args):
+            params = [a.arg for a in node.args.args]
+            inner = bound | set(params)
+            term = self.__term(node.body, scope, env, inner,
+                               shadowed - set(params))
+            for param in reversed(params):
+                term = Lam(param, term)
+            return term
+
+        elif isinstance(node, ast.Tuple) and isinstance(node.ctx, ast.Load) \
+                and len(node.elts) > 1 and \
+                not any(isinstance(e, ast.Starred) for e in node.elts):
+            elts = [TypeVariable() for _ in node.elts]
+            t = Tuple(elts)
+            for elt in reversed(elts):
+                t = Function(elt, t)
+            return self.__apply(self.__literal(env, t), node.elts, scope, env,
+                                bound, shadowed)
+
+        elif isinstance(node, ast.IfExp):
+            a = TypeVariable()
+            t = Function(TypeVariable(), Function(a, Function(a, a)))
+            return self.__apply(self.__literal(env, t),
+                                (node.test, node.body, node.orelse),
+                                scope, env, bound, shadowed)
+
+        # anything else has an unknown type, but its operands are still checked
+        stored = set(n.id for n in ast.walk(node)
+                     if isinstance(n, ast.Name) and
+                     isinstance(n.ctx, ast.Store))
+        return self.__apply(self.__unknown(env), self.__operands(node),
+                            scope, env, bound - stored, shadowed | stored)
+
+    def __apply(self, term, args, scope, env, bound, shadowed):
+        for arg in args:
+            term = App(term, self.__term(arg, scope, env, bound, shadowed))
+        return term
+
+    def __operands(self, node):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.expr):
+                if not (isinstance(child, ast.Name) and
+                        isinstance(child.ctx, ast.Store)):
+                    yield child
+            elif isinstance(child, (ast.comprehension, ast.keyword)):
+                for grandchild in self.__operands(child):
+                    yield grandchild
+
+    def __simple(self, arguments):
+        return arguments.args and not (
+            getattr(arguments, "posonlyargs", []) or arguments.vararg or
+            arguments.kwarg or arguments.kwonlyargs or arguments.defaults)
+
+    def __unknown(self, env):
+        return self.__literal(env, TypeVariable())
+
+    def __literal(self, env, t):
+        name = "<%d>" % next(self.__names)
+        env[name] = t
+        return Var(name)
+
+    def __global(self, name):
+        """
+        The type of a module-level name, or None if it has no type that can be
+        relied upon (e.g. an untyped Python function).
+        """
+        if name in self.__globals:
+            return self.__globals[name]
+        if not hasattr(self.module, name):
+            self.__globals[name] = None
+            return None
+        value = getattr(self.module, name)
+        t = None
+        try:
+            if isinstance(value, (TypedCallable, Hask)):
+                t = TypeScheme(typeof(value))
+            elif not callable(value) and type_witness(value) is not None:
+                t = typeof(value)
+        except TypeError:
+            t = None
+        self.__globals[name] = t
+        return t
+
+    #-------------------------------------------------------------------------#
+    # Helpers
+
+    def __typed_lambda(self, node):
+        """
+        Recognise `name = (lambda ...: ...) ** (H/ ...)` at the top level of
+        the module.
+
+        Returns: The TypedFunc, the lambda's arguments and its body, or None
+        """
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1 or \
+                not isinstance(node.targets[0], ast.Name) or \
+                not isinstance(node.value, ast.BinOp) or \
+                not isinstance(node.value.op, ast.Pow) or \
+                not isinstance(node.value.left, ast.Lambda):
+            return None
+        fn = getattr(self.module, node.targets[0].id, None)
+        if not isinstance(fn, TypedFunc) or fn.__root__ is not None:
+            return None
+        return fn, node.value.left.args, node.value.left.body
+
+    def __variables(self, t):
+        found = []
+        pending = [t]
+        while pending:
+            p = prune(pending.pop())
+            if isinstance(p, TypeVariable):
+                if p not in found:
+                    found.append(p)
+            elif isinstance(p, TypeOperator) and not p.is_ground:
+                pending.extend(p.types)
+        return found
+
+    def __error(self, node, message):
+        line = node.lineno
+        if sys.version_info < (3, 8) and \
+                getattr(node, "decorator_list", None):
+            # before Python 3.8, a decorated definition starts at its first
+            # decorator rather than at the def, which follows the last one
+            line = max(n.lineno for n in ast.walk(node.decorator_list[-1])
+                       if hasattr(n, "lineno")) + 1
+        self.errors.append(Diagnostic(self.filename, line, message))
+
+
+#=============================================================================#
+# Command line
+
+
+def load_module(target):
+    """
+    Import a module, given either the path of its source file or its dotted
+    name. Modules loaded from a file are not added to sys.modules, and so are
+    not run as __main__.
+
+    Args:
+        target: the path of the module's source file, or its name
+
+    Returns: The module and the path of its source file
+    """
+    if os.path.exists(target):
+        path = os.path.abspath(target)
+        name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module, path
+    module = importlib.import_module(target)
+    return module, module.__file__
+
+
+def check_file(target):
+    """
+    Type check a module ahead of time.
+
+    Args:
+        target: the path of the module's source file, or its dotted name
+
+    Returns: The ModuleChecker, holding the Diagnostics found
+    """
+    checker = ModuleChecker(None, None, target)
+    try:
+        checker.module, path = load_module(target)
+    except Exception as e:
+        path = os.path.abspath(target)
+        line = 0
+        for frame, lineno in traceback.walk_tb(e.__traceback__):
+            if frame.f_code.co_filename == path:
+                line = lineno
+        checker.errors.append(Diagnostic(target, line, "Cannot import module: "
+                                         "%s: %s" % (type(e).__name__, e)))
+        return checker
+
+    with open(path) as f:
+        checker.tree = ast.parse(f.read(), path)
+    checker.check()
+    return checker
+
+
+def main(argv=None):
+    """
+    Type check the modules named on the command line, printing any errors.
+
+    Returns: The exit status: 0 if all modules passed, 1 otherwise
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.stderr.write("usage: python -m hask.check module.py|module.name "
+                         "[...]\n")
+        return 2
+
+    failed = False
+    for path in argv:
+        checker = check_file(path)
+        for error in checker.errors:
+            sys.stdout.write(str(error) + "\n")
+        failed = failed or bool(checker.errors)
+        sys.stdout.write("%s: %d typed functions checked, %d skipped, "
+                         "%d errors\n" % (path, checker.checked,
+                                           checker.skipped,
+                                           len(checker.errors)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
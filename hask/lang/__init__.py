@@ -22,6 +22,11 @@ from .type_system import Typeclass
 from .type_system import Hask
 from .type_system import TypedFunc
 from .type_system import TypeSignatureError
+from .type_system import typecheck
+from .type_system import get_typecheck
+from .type_system import set_typecheck
+from .type_system import specialize
+from .type_system import bulk
 
 from .syntax import undefined
 from .syntax import caseof
@@ -33,6 +38,7 @@ from .syntax import d
 from .syntax import deriving
 from .syntax import H
 from .syntax import sig
+from .syntax import dispatch
 from .syntax import t
 from .syntax import func
 from .syntax import typify
@@ -51,4 +57,9 @@ from .type_vars import *
 from .lazylist import List
 from .lazylist import L
 
+from .backend import get_backend
+from .backend import set_backend
+
 from .annotations import constraint, annotated
+
+from .profiler import TypeProfiler
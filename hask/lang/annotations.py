@@ -1,6 +1,6 @@
 from hask import *
 from hask.lang.syntax import __signature__
-from hask.lang.type_system import build_sig, make_fn_type, TypedFunc
+from hask.lang.type_system import build_typed_func
 import inspect
 
 def constraint(*constraints):
@@ -22,10 +22,7 @@ def constraint(*constraints):
 
         sig = __signature__(types, constraints).sig
 
-        fn_args = build_sig(sig)
-        fn_type = make_fn_type(fn_args)
-
-        res = TypedFunc(fn, fn_args, fn_type)
+        res = build_typed_func(fn, sig)
         setattr(res, '__annotations__', fn.__annotations__)
         return res
     return make_typed
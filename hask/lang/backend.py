@@ -0,0 +1,331 @@
+import array
+import math
+import operator
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .lazylist import List
+
+
+#=============================================================================#
+# Numeric backends
+
+
+__backends__ = ("python", "numpy")
+
+
+def __default_backend(name):
+    """
+    The backend named by the HASK_BACKEND environment variable, if it can be
+    used.
+    """
+    if name == "numpy" and numpy is None:
+        return "python"
+    return name if name in __backends__ else "python"
+
+
+__backend__ = [__default_backend(os.environ.get("HASK_BACKEND", "python"))]
+
+
+def get_backend():
+    """
+    Returns the name of the numeric backend currently in effect.
+    """
+    return __backend__[0]
+
+
+def set_backend(name):
+    """
+    Set the numeric backend (the default is taken from the HASK_BACKEND
+    environment variable, or "python" if it is unset).
+
+    With the "numpy" backend, some Data.List functions applied to Lists stored
+    compactly (see List) run as vectorized NumPy operations rather than one
+    call per element: map and zipWith with an operator section (e.g. __ * 2
+    or __ + __), filter with a comparison section (e.g. __ > 0), foldl and
+    scanl with (__ + __) or (__ * __), sum, product and sort. They give the
+    same results as the "python" backend, which they fall back on whenever
+    NumPy could not (e.g. if an int might overflow 64 bits, or for division
+    by zero). Note that they evaluate the whole of a compact List at once.
+
+    Args:
+        name: "python" or "numpy"
+
+    Raises:
+        ValueError, if there is no backend with the given name
+        ImportError, if name is "numpy" and NumPy is not installed
+    """
+    if name not in __backends__:
+        raise ValueError("Unknown backend: %s" % name)
+    elif name == "numpy" and numpy is None:
+        raise ImportError("The numpy backend needs NumPy to be installed")
+    __backend__[0] = name
+    return
+
+
+#=============================================================================#
+# Vectorized operations
+
+# operators that NumPy applies to each element of an array of ints or of
+# floats just as Python applies them to one int or float, barring overflow
+# and division by zero
+__exact_ops__ = {
+    int: frozenset((operator.add, operator.sub, operator.mul,
+                    operator.floordiv, operator.mod, operator.truediv,
+                    operator.and_, operator.or_, operator.xor,
+                    operator.eq, operator.ne, operator.lt, operator.le,
+                    operator.gt, operator.ge)),
+    float: frozenset((operator.add, operator.sub, operator.mul,
+                      operator.floordiv, operator.mod, operator.truediv,
+                      operator.eq, operator.ne, operator.lt, operator.le,
+                      operator.gt, operator.ge)),
+}
+
+__comparisons__ = frozenset((operator.eq, operator.ne, operator.lt,
+                             operator.le, operator.gt, operator.ge))
+
+__divisions__ = frozenset((operator.floordiv, operator.mod,
+                           operator.truediv))
+
+__ufuncs__ = {operator.add: "add", operator.mul: "multiply"}
+
+__int64_max__ = 2**63 - 1
+
+
+def __section(fn, arity):
+    """
+    The operator applied by fn, if it is an operator section of the given
+    arity that some element type can be vectorized for, as (op, flipped,
+    bound operands); or None.
+    """
+    if __backend__[0] != "numpy":
+        return None
+    section = getattr(fn, "__operator__", None)
+    if section is None or len(section[2]) + arity != 2 or \
+            not any(section[0] in ops for ops in __exact_ops__.values()):
+        return None
+    return section
+
+
+def __arrays(xss):
+    """
+    NumPy views of the arrays the Lists xss are stored in, and the Python type
+    of their elements; or None if any of them is not stored compactly, they
+    differ in type or any of them is empty.
+    """
+    arrays = []
+    for xs in xss:
+        packed = xs.buffer()
+        if packed is None or len(packed) == 0:
+            return None
+        arrays.append(numpy.frombuffer(packed, dtype=packed.typecode))
+    kinds = set(x.dtype for x in arrays)
+    if len(kinds) != 1:
+        return None
+    return arrays, (int if arrays[0].dtype.kind == "i" else float)
+
+
+def __bounds(x):
+    """
+    The least and greatest of x, a NumPy array or a Python number.
+    """
+    if isinstance(x, numpy.ndarray):
+        return x.min().item(), x.max().item()
+    return x, x
+
+
+def __exact_operand(y, kind):
+    """
+    Whether NumPy converts y just as Python does when combining it with
+    elements of type kind.
+    """
+    return type(y) is kind or \
+        (kind is float and type(y) is int and abs(y) <= 2**53)
+
+
+def __apply(section, args, kind):
+    """
+    Apply the operator of a section elementwise to args, NumPy arrays of
+    elements of type kind and bound operands, if NumPy gives the same results
+    as Python would.
+
+    Returns: A NumPy array, or None
+    """
+    op, flipped, _ = section
+    operands = [x for x in args if not isinstance(x, numpy.ndarray)]
+    if op not in __exact_ops__[kind] or \
+            not all(__exact_operand(y, kind) for y in operands):
+        return None
+    if flipped:
+        args = args[::-1]
+
+    if op in __divisions__ and numpy.any(args[1] == 0):
+        return None
+    elif kind is int:
+        bounds = [__bounds(x) for x in args]
+        limit = 2**53 if op is operator.truediv else __int64_max__
+        if op in (operator.add, operator.sub, operator.mul):
+            extremes = [op(a, b) for a in bounds[0] for b in bounds[1]]
+        else:
+            extremes = bounds[0] + bounds[1]
+        # the least int64 overflows when divided by -1
+        if any(abs(x) > limit for x in extremes) or \
+                (op in __divisions__ and bounds[0][0] == -limit - 1):
+            return None
+    # Python computes NaN and infinities without complaint, so NumPy must not
+    # warn about them either
+    with numpy.errstate(all="ignore"):
+        return op(*args)
+
+
+def __accumulate(op, z, x, kind):
+    """
+    The successive results of folding op over z and then the elements of x,
+    from the left, as Python would compute them; or None if NumPy cannot.
+    """
+    if op not in __ufuncs__ or type(z) is not kind:
+        return None
+    elif kind is int:
+        if op is operator.add:
+            bound = abs(z) + len(x) * max(map(abs, __bounds(x)))
+            if bound > __int64_max__:
+                return None
+        else:
+            magnitudes = numpy.maximum(numpy.abs(x.astype(float)), 1)
+            if math.log2(max(abs(z), 1)) + numpy.log2(magnitudes).sum() > 62:
+                return None
+
+    steps = numpy.empty(len(x) + 1, dtype=x.dtype)
+    steps[0] = z
+    steps[1:] = x
+    with numpy.errstate(all="ignore"):
+        return getattr(numpy, __ufuncs__[op]).accumulate(steps)
+
+
+def __from_array(x):
+    """
+    A List of the elements of x, a NumPy array.
+    """
+    if x.dtype.kind not in "if":
+        return List(head=x.tolist())
+    packed = array.array("q" if x.dtype.kind == "i" else "d")
+    packed.frombytes(numpy.ascontiguousarray(x).tobytes())
+    return List(head=packed)
+
+
+def vmap(fn, *xss):
+    """
+    map or zipWith fn, an operator section, over the Lists xss, if it can be
+    vectorized (see set_backend).
+
+    Returns: A List, or None
+    """
+    section = __section(fn, len(xss))
+    arrays = section and __arrays(xss)
+    if not arrays:
+        return None
+    arrays, kind = arrays
+    n = min(len(x) for x in arrays)
+    result = __apply(section, [x[:n] for x in arrays] + list(section[2]),
+                     kind)
+    return None if result is None else __from_array(result)
+
+
+def vfilter(fn, xs):
+    """
+    filter the List xs with fn, a comparison section, if it can be vectorized
+    (see set_backend).
+
+    Returns: A List, or None
+    """
+    section = __section(fn, 1)
+    arrays = section and section[0] in __comparisons__ and __arrays([xs])
+    if not arrays:
+        return None
+    (x,), kind = arrays
+    mask = __apply(section, [x] + list(section[2]), kind)
+    return None if mask is None else __from_array(x[mask])
+
+
+def vscanl(fn, z, xs):
+    """
+    scanl fn, (__ + __) or (__ * __), over z and the List xs, if it can be
+    vectorized (see set_backend).
+
+    Returns: A List, or None
+    """
+    section = __section(fn, 2)
+    arrays = section and not section[1] and __arrays([xs])
+    if not arrays:
+        return None
+    (x,), kind = arrays
+    steps = __accumulate(section[0], z, x, kind)
+    return None if steps is None else __from_array(steps)
+
+
+def vfoldl(fn, z, xs):
+    """
+    foldl fn, (__ + __) or (__ * __), over z and the List xs, if it can be
+    vectorized (see set_backend).
+
+    Returns: The result of the fold, or None
+    """
+    section = __section(fn, 2)
+    if section is None or section[1]:
+        return None
+    return __fold(section[0], z, xs)
+
+
+def vsum(xs):
+    """
+    The sum of the List xs, if it can be vectorized (see set_backend).
+    """
+    if __backend__[0] != "numpy":
+        return None
+    return __fold(operator.add, 0, xs)
+
+
+def vproduct(xs):
+    """
+    The product of the List xs, if it can be vectorized (see set_backend).
+    """
+    if __backend__[0] != "numpy":
+        return None
+    return __fold(operator.mul, 1, xs)
+
+
+def __fold(op, z, xs):
+    """
+    Fold op over z and then the elements of xs, from the left, if NumPy can.
+    """
+    arrays = __arrays([xs])
+    if not arrays:
+        return None
+    (x,), kind = arrays
+    if kind is float and __exact_operand(z, kind):
+        # as Python converts it when adding or multiplying it by a float
+        z = float(z)
+    steps = __accumulate(op, z, x, kind)
+    return None if steps is None else steps[-1].item()
+
+
+def vsort(xs):
+    """
+    sort the List xs, if it can be vectorized (see set_backend).
+
+    Returns: A List, or None
+    """
+    if __backend__[0] != "numpy":
+        return None
+    arrays = __arrays([xs])
+    if not arrays:
+        return None
+    (x,), kind = arrays
+    if kind is float and numpy.isnan(x).any():
+        # Python does not sort NaN consistently, and NumPy puts it last
+        return None
+    return __from_array(numpy.sort(x, kind="stable"))
@@ -15,6 +15,11 @@
 # 4) Type unification also unifies typeclass constraints
 
 
+import itertools
+import threading
+import weakref
+
+
 #=============================================================================#
 # Class definitions for the AST nodes which comprise the type language for
 # which types will be inferred
@@ -92,28 +97,38 @@ class TypeVariable(object):
     A type variable standing for an arbitrary type. All type variables have
     a unique id, but names are only assigned lazily, when required.
 
-    Note that this approach is *not* thread-safe.
+    The supply of names is kept per thread, so that concurrent threads naming
+    type variables (e.g. while printing types) do not interfere.
     """
 
-    next_variable_id = 0
-    next_var_name = 'a'
+    __ids__ = itertools.count()
+    __names__ = threading.local()
+    is_ground = False
+    rank = 0
 
     def __init__(self, constraints=()):
-        self.id = TypeVariable.next_variable_id
-        TypeVariable.next_variable_id += 1
+        self.id = next(TypeVariable.__ids__)
         self.instance = None
         self.__name = None
         self.constraints = constraints
 
+    @staticmethod
+    def reset_names():
+        """
+        Restart the current thread's supply of type variable names at 'a'.
+        """
+        TypeVariable.__names__.next = 'a'
+        return
+
     def __getName(self):
         """
         Names are allocated to TypeVariables lazily, so that only TypeVariables
         converted to strings are given names.
         """
         if self.__name is None:
-            self.__name = TypeVariable.next_var_name
-            TypeVariable.next_var_name = chr(ord(TypeVariable.next_var_name)
-                                             + 1)
+            names = TypeVariable.__names__
+            self.__name = getattr(names, "next", 'a')
+            names.next = chr(ord(self.__name) + 1)
         return self.__name
 
     name = property(__getName)
@@ -128,11 +143,49 @@ class TypeVariable(object):
 
 
 class TypeOperator(object):
-    """An n-ary type constructor which builds a new type from old"""
+    """
+    An n-ary type constructor which builds a new type from old.
+
+    Ground type operators (those built only from other ground type operators)
+    are hash-consed: constructing one that already exists returns the existing
+    object. Ground types can therefore be compared with `is` and used as
+    dictionary keys, and they are never mutated by unification.
+
+    The table of interned types only holds them weakly, so a ground type that
+    is no longer used anywhere is dropped from it, rather than every ground
+    type ever built being kept alive. Building one is serialised by a lock, so
+    that two threads never intern different objects for the same type.
+    """
+
+    __interned__ = weakref.WeakValueDictionary()
+    __interning__ = threading.Lock()
+
+    def __new__(cls, name, types):
+        if cls is TypeOperator:
+            if name is tuple and len(types) > 0:
+                cls = Tuple
+            else:
+                cls = __canonical_operators__.get((name, len(types)), cls)
+
+        is_ground = not isinstance(name, TypeVariable) and \
+            all(isinstance(t, TypeOperator) and t.is_ground for t in types)
+
+        if is_ground:
+            key = (name, tuple(types))
+            interned = TypeOperator.__interned__.get(key)
+            if interned is not None:
+                return interned
 
-    def __init__(self, name, types):
+        self = object.__new__(cls)
         self.name = name
         self.types = types
+        self.is_ground = is_ground
+
+        if is_ground:
+            self.types = list(types)
+            with TypeOperator.__interning__:
+                return TypeOperator.__interned__.setdefault(key, self)
+        return self
 
     def __str__(self):
         num_types = len(self.types)
@@ -145,8 +198,8 @@ class TypeOperator(object):
 class Function(TypeOperator):
     """A binary type constructor which builds function types"""
 
-    def __init__(self, from_type, to_type):
-        super(self.__class__, self).__init__("->", [from_type, to_type])
+    def __new__(cls, from_type, to_type):
+        return TypeOperator.__new__(cls, "->", [from_type, to_type])
 
     def __str__(self):
         return "({1} {0} {2})".format(show_type(self.name),
@@ -156,8 +209,8 @@ class Function(TypeOperator):
 class Tuple(TypeOperator):
     """N-ary constructor which builds tuple types"""
 
-    def __init__(self, types):
-        super(self.__class__, self).__init__(tuple, types)
+    def __new__(cls, types):
+        return TypeOperator.__new__(cls, tuple, types)
 
     def __str__(self):
         return "({0})".format(", ".join(list(map(show_type, self.types))))
@@ -166,13 +219,46 @@ class Tuple(TypeOperator):
 class ListType(TypeOperator):
     """Unary constructor which builds list types"""
 
-    def __init__(self, list_type):
-        super(self.__class__, self).__init__("[]", [list_type])
+    def __new__(cls, list_type):
+        return TypeOperator.__new__(cls, "[]", [list_type])
 
     def __str__(self):
         return "[{0}]".format(show_type(self.types[0]))
 
 
+# TypeOperators built directly from one of these (name, arity) pairs (or from
+# a non-empty tuple type), e.g. by fresh(), are given the corresponding subclass
+# so that they print properly and intern to the same object as the subclass
+# would.
+__canonical_operators__ = {("->", 2): Function, ("[]", 1): ListType}
+
+
+def ground(t):
+    """
+    Returns the interned ground type equivalent to t, or None if t contains
+    uninstantiated type variables.
+
+    Args:
+        t: The type to examine
+
+    Returns:
+        An interned TypeOperator, or None
+    """
+    p = prune(t)
+    if isinstance(p, TypeVariable) or isinstance(p.name, TypeVariable):
+        return None
+    elif p.is_ground:
+        return p
+
+    types = []
+    for x in p.types:
+        g = ground(x)
+        if g is None:
+            return None
+        types.append(g)
+    return TypeOperator.__new__(type(p), p.name, types)
+
+
 #=============================================================================#
 # Type inference machinery
 
@@ -240,7 +326,8 @@ def getType(name, env, non_generic):
 
     Args:
         name: The identifier name
-        env: The type environment mapping from identifier names to types
+        env: The type environment mapping from identifier names to types or
+            TypeSchemes
         non_generic: A set of non-generic TypeVariables
 
     Raises:
@@ -248,7 +335,10 @@ def getType(name, env, non_generic):
             environment.
     """
     if name in env:
-        return fresh(env[name], non_generic)
+        t = env[name]
+        if isinstance(t, TypeScheme):
+            return t.instantiate(non_generic)
+        return fresh(t, non_generic)
     raise TypeError("Undefined symbol {0}".format(name))
 
 
@@ -263,11 +353,14 @@ def fresh(t, non_generic):
         non_generic: A set of non-generic TypeVariables
     """
     mappings = {}  # A mapping of TypeVariables to TypeVariables
+    shared = nonGenericVariables(non_generic)
 
     def freshrec(tp):
         p = prune(tp)
-        if isinstance(p, TypeVariable):
-            if isGeneric(p, non_generic):
+        if isinstance(p, TypeOperator) and p.is_ground:
+            return p
+        elif isinstance(p, TypeVariable):
+            if p not in shared:
                 if p not in mappings:
                     mappings[p] = TypeVariable()
                 return mappings[p]
@@ -279,12 +372,98 @@ def fresh(t, non_generic):
     return freshrec(t)
 
 
+class TypeScheme(object):
+    """
+    A type with its generic type variables quantified, i.e. "forall a b. t".
+
+    The type is walked and pruned once, when the scheme is built, recording
+    where the quantified variables occur. Instantiating the scheme then only
+    substitutes new type variables into those positions, which is much cheaper
+    than copying the type with fresh() on every use.
+
+    A scheme describes its type as it was when the scheme was built; if any of
+    its variables are later bound by unification, valid() becomes False and
+    the scheme must be rebuilt.
+    """
+    def __init__(self, t):
+        self.type = t
+        self.variables = []
+        self.__positions = {}
+        self.__operators = []
+        self.__template = self.__compile(t)
+
+    def __compile(self, tp):
+        # the template is the type itself for ground subterms, the index of
+        # the variable for quantified variables, and a (class, name, [args])
+        # triple for all other type operators
+        p = prune(tp)
+        if isinstance(p, TypeVariable):
+            if p not in self.__positions:
+                self.__positions[p] = len(self.variables)
+                self.variables.append(p)
+            return self.__positions[p]
+        elif p.is_ground:
+            return p
+        self.__operators.append((p, p.name, p.types))
+        return (type(p), p.name, [self.__compile(x) for x in p.types])
+
+    def valid(self):
+        """
+        Checks that the type has not changed since the scheme was built.
+        """
+        for v in self.variables:
+            if v.instance is not None:
+                return False
+        for op, name, types in self.__operators:
+            if op.name is not name or op.types is not types:
+                return False
+        return True
+
+    def instantiate(self, non_generic=(), constraints=False):
+        """
+        Returns a copy of the type with new type variables substituted for the
+        quantified ones. Variables occurring in the types of non_generic are
+        shared with the original type rather than replaced, as in fresh().
+
+        Args:
+            non_generic: A set of non-generic TypeVariables
+            constraints: Whether the new type variables keep the typeclass
+                constraints of the ones they replace (fresh() drops them)
+        """
+        shared = nonGenericVariables(non_generic)
+        substitution = [
+            v if v in shared else
+            TypeVariable(v.constraints) if constraints else TypeVariable()
+            for v in self.variables]
+
+        # operators in the template contain type variables, so their copies
+        # are never ground and need not go through TypeOperator.__new__
+        def build(node):
+            if type(node) is int:
+                return substitution[node]
+            elif type(node) is tuple:
+                cls, name, types = node
+                op = object.__new__(cls)
+                op.name = name
+                op.types = [build(x) for x in types]
+                op.is_ground = False
+                return op
+            return node
+
+        return build(self.__template)
+
+
 def unify_var(v1, t2):
     """
     Unify the type variable v1 and the type t2, i.e. makes their types the same
     and unifies typeclass constraints.
     Note: Must be called with v1 and t2 pre-pruned
 
+    Type variables form a union-find forest (via their `instance` links):
+    when two unbound variables are unified, the root of lower rank is linked
+    beneath the root of higher rank, which keeps the chains followed by prune
+    short.
+
     Args:
         v1: The type variable to be made equivalent
         t2: The second type to be be equivalent
@@ -295,16 +474,27 @@ def unify_var(v1, t2):
     Raises:
         TypeError: Raised if the types cannot be unified.
     """
-    if v1 != t2:
-        if isinstance(t2, TypeVariable):
-            # unify typeclass constraints
-            union = tuple(set(v1.constraints + t2.constraints))
-            v1.constraints = union
-            t2.constraints = union
-
-        if occursInType(v1, t2):
-            raise TypeError("recursive unification")
-        v1.instance = t2
+    if v1 is t2:
+        return
+
+    elif isinstance(t2, TypeVariable):
+        # unify typeclass constraints
+        union = tuple(set(v1.constraints + t2.constraints))
+        v1.constraints = union
+        t2.constraints = union
+
+        # union by rank
+        if v1.rank > t2.rank:
+            t2.instance = v1
+        else:
+            if v1.rank == t2.rank:
+                t2.rank += 1
+            v1.instance = t2
+        return
+
+    if occursInType(v1, t2):
+        raise TypeError("recursive unification")
+    v1.instance = t2
     return
 
 
@@ -317,6 +507,9 @@ def unify(t1, t2):
     This is due to the way that typeclasses are implemented, and will be fixed
     in future versions.
 
+    Pairs of subterms still to be unified are kept on an explicit stack rather
+    than the Python call stack, so arbitrarily deep types can be unified.
+
     Args:
         t1: The first type to be made equivalent
         t2: The second type to be be equivalent
@@ -327,28 +520,39 @@ def unify(t1, t2):
     Raises:
         TypeError: Raised if the types cannot be unified.
     """
-    a = prune(t1)
-    b = prune(t2)
-    if isinstance(a, TypeVariable):
-        unify_var(a, b)
-    elif isinstance(a, TypeOperator) and isinstance(b, TypeVariable):
-        unify_var(b, a)
-    elif isinstance(a, TypeOperator) and isinstance(b, TypeOperator):
-        # Unify polymorphic higher-kinded type
-        if isinstance(a.name, TypeVariable) and len(a.types) > 0:
-            a.name = b.name
-            a.types = b.types
-            unify(a, b)
-        elif isinstance(b.name, TypeVariable):
-            unify(b, a)
-
-        # Unify concrete higher-kinded type
-        elif (a.name != b.name or len(a.types) != len(b.types)):
-            raise TypeError("Type mismatch: {0} != {1}".format(str(a), str(b)))
-        for p, q in zip(a.types, b.types):
-            unify(p, q)
-    else:
-        raise TypeError("Not unified")
+    pending = [(t1, t2)]
+    while pending:
+        a, b = pending.pop()
+        a = prune(a)
+        b = prune(b)
+        if a is b:
+            continue
+        elif isinstance(a, TypeVariable):
+            unify_var(a, b)
+        elif isinstance(a, TypeOperator) and isinstance(b, TypeVariable):
+            unify_var(b, a)
+        elif isinstance(a, TypeOperator) and isinstance(b, TypeOperator):
+            # Distinct ground types are never equal, since they are interned
+            if a.is_ground and b.is_ground:
+                raise TypeError("Type mismatch: {0} != {1}".format(str(a),
+                                                                  str(b)))
+
+            # Unify polymorphic higher-kinded type
+            elif isinstance(a.name, TypeVariable) and len(a.types) > 0:
+                a.name = b.name
+                a.types = b.types
+            elif isinstance(b.name, TypeVariable) and len(b.types) > 0:
+                b.name = a.name
+                b.types = a.types
+
+            # Unify concrete higher-kinded type
+            elif (a.name != b.name or len(a.types) != len(b.types)):
+                raise TypeError("Type mismatch: {0} != {1}".format(str(a),
+                                                                  str(b)))
+            else:
+                pending.extend(reversed(list(zip(a.types, b.types))))
+        else:
+            raise TypeError("Not unified")
     return
 
 
@@ -360,7 +564,7 @@ def prune(t):
     return a type expression which is either an uninstantiated type variable or
     a type operator; i.e. it will skip instantiated variables, and will
     actually prune them from expressions to remove long chains of instantiated
-    variables.
+    variables (path compression).
 
     Args:
         t: The type to be pruned
@@ -368,11 +572,13 @@ def prune(t):
     Returns:
         An uninstantiated TypeVariable or a TypeOperator
     """
-    if isinstance(t, TypeVariable):
-        if t.instance is not None:
-            t.instance = prune(t.instance)
-            return t.instance
-    return t
+    root = t
+    while isinstance(root, TypeVariable) and root.instance is not None:
+        root = root.instance
+
+    while t is not root and t.instance is not root:
+        t.instance, t = root, t.instance
+    return root
 
 
 def isGeneric(v, non_generic):
@@ -395,6 +601,29 @@ def isGeneric(v, non_generic):
     return not occursIn(v, non_generic)
 
 
+def nonGenericVariables(non_generic):
+    """
+    Collects the type variables occurring in a set of non-generic variables
+    (which may have been instantiated to type terms), so that the genericity
+    of any number of variables can then be tested with a set lookup.
+
+    Args:
+        non_generic: A set of non-generic TypeVariables
+
+    Returns:
+        The set of (pruned) non-generic TypeVariables
+    """
+    shared = set()
+    pending = list(non_generic)
+    while pending:
+        p = prune(pending.pop())
+        if isinstance(p, TypeVariable):
+            shared.add(p)
+        elif not p.is_ground:
+            pending.extend(p.types)
+    return shared
+
+
 def occursInType(v, type2):
     """Checks whether a type variable occurs in a type expression.
 
@@ -407,11 +636,14 @@ def occursInType(v, type2):
     Returns:
         True if v occurs in type2, otherwise False
     """
-    pruned_type2 = prune(type2)
-    if pruned_type2 == v:
-        return True
-    elif isinstance(pruned_type2, TypeOperator):
-        return occursIn(v, pruned_type2.types)
+    pending = [type2]
+    while pending:
+        pruned_type2 = prune(pending.pop())
+        if pruned_type2 is v:
+            return True
+        elif isinstance(pruned_type2, TypeOperator) and \
+                not pruned_type2.is_ground:
+            pending.extend(pruned_type2.types)
     return False
 
 
@@ -1,3 +1,4 @@
+import array
 import collections.abc
 import itertools
 import sys
@@ -7,20 +8,30 @@ from .hindley_milner import ListType
 from .hindley_milner import unify
 
 from .type_system import typeof
+from .type_system import type_witness
 from .type_system import Typeclass
 from .type_system import Hask
 from .type_system import build_instance
+from .type_system import typechecking
+from .type_system import outside_typed_code
 
 from .typeclasses import Show, show, Eq, Ord
 
 from .syntax import Syntax
 from .syntax import instance
 from .syntax import sig
+from .syntax import dispatch
 from .syntax import H
 
 
 cmp = lambda a, b: (a > b) - (a < b)
 
+# marks the end of the shorter List in comparisons
+__end__ = object()
+
+# the array typecodes used to store Lists of each type compactly (see List)
+__compact_typecodes__ = {int: "q", float: "d"}
+
 
 class Enum(Typeclass):
     """
@@ -94,6 +105,7 @@ def fromEnum(a):
     return Enum[a].toEnum(a)
 
 
+@dispatch(Enum, "succ")
 @sig(H/ "a" >> "a")
 def succ(a):
     """
@@ -104,6 +116,7 @@ def succ(a):
     return Enum[a].succ(a)
 
 
+@dispatch(Enum, "pred")
 @sig(H/ "a" >> "a")
 def pred(a):
     """
@@ -114,6 +127,13 @@ def pred(a):
     return Enum[a].pred(a)
 
 
+# bounded arithmetic sequences are cheap to compute, so the Lists built from
+# them evaluate this many elements at a time (see List). Unbounded ones are
+# evaluated only as far as they are needed, since an Enum need not have a
+# successor for every value (e.g. one whose toEnum indexes a finite list)
+__sequence_chunk__ = 64
+
+
 @sig(H/ "a" >> "a" >> ["a"])
 def enumFromThen(start, second):
     """
@@ -141,7 +161,9 @@ def enumFromThenTo(start, second, end):
 
     Used in translation of ``L[n, n_, ..., m]``
     """
-    return L[Enum[start].enumFromThenTo(start, second, end)]
+    return List(tail=Enum[start].enumFromThenTo(start, second, end),
+                chunk=__sequence_chunk__,
+                compact=__machine_ints(start, second, end) or None)
 
 
 @sig(H/ "a" >> "a" >> ["a"])
@@ -151,7 +173,17 @@ def enumFromTo(start, end):
 
     Used in translation of ``L[n, ..., m]``
     """
-    return L[Enum[start].enumFromTo(start, end)]
+    return List(tail=Enum[start].enumFromTo(start, end),
+                chunk=__sequence_chunk__,
+                compact=__machine_ints(start, end) or None)
+
+
+def __machine_ints(*bounds):
+    """
+    Whether the elements of an arithmetic sequence with the given bounds are
+    all ints that can be stored compactly.
+    """
+    return all(type(x) is int and -2**63 <= x < 2**63 for x in bounds)
 
 
 instance(Enum, int).where(fromEnum=int, toEnum=int)
@@ -163,61 +195,587 @@ instance(Enum, str).where(fromEnum=ord, toEnum=chr)
 # List
 
 
+class __window__(list):
+    """
+    The head of a List evaluated with a window (see List): the elements still
+    kept, the number of elements dropped before them, and the first element
+    ever evaluated, kept as a sample of the type of the elements.
+    """
+    __slots__ = ("dropped", "first")
+
+    def __init__(self):
+        self.dropped = 0
+        self.first = None
+
+
+class __concatenation__(object):
+    """
+    The tail of a List made by concatenating Lists (see List.__add__): the
+    elements of the Lists in front, a linked list of (List, next) pairs, then
+    of those in lists[start:n], one List after another.
+
+    Both parts are shared with other concatenations of the same Lists, and
+    neither is ever changed: Lists are only added before the front, or after
+    the end of the list of Lists (a run), by a concatenation ending where the
+    run does. Any other concatenation copies its part of the run before adding
+    to it. So concatenating a List onto either end of a concatenation takes
+    constant time (amortised), and iterating over one never nests.
+
+    Once iteration has started, current is the List it has reached (None once
+    it has finished), rest the front and start of the Lists after it, and
+    taken the number of elements taken from the Lists before it.
+    """
+    __slots__ = ("front", "lists", "start", "n", "started", "current", "rest",
+                 "taken")
+
+    def __init__(self, front, lists, start, n):
+        self.front = front
+        self.lists = lists
+        self.start = start
+        self.n = n
+        self.started = False
+        self.current = None
+        self.rest = None
+        self.taken = 0
+
+    def first(self):
+        """
+        The first of the Lists, or None if there are none.
+        """
+        if self.front is not None:
+            return self.front[0]
+        return self.lists[self.start] if self.start < self.n else None
+
+    def segments(self, front, start):
+        """
+        The Lists in front, then those in the run from start on, as a Python
+        list.
+        """
+        lists = []
+        while front is not None:
+            lst, front = front
+            lists.append(lst)
+        return lists + self.lists[start:self.n]
+
+    def extend(self, first, front, start, lists):
+        """
+        Returns the concatenation of the Lists in first, then the Lists in
+        front and those in the run from start on, then the Lists in lists.
+        """
+        run = self.lists
+        if lists and len(run) != self.n:
+            run, start = run[start:self.n], 0
+        run.extend(lists)
+        for lst in reversed(first):
+            front = (lst, front)
+        return __concatenation__(front, run, start,
+                                 len(run) if lists else self.n)
+
+    def __iter__(self):
+        self.started = True
+        front, i = self.front, self.start
+        while True:
+            if front is not None:
+                lst, front = front
+            elif i < self.n:
+                lst, i = self.lists[i], i + 1
+            else:
+                self.current = None
+                return
+            self.current, self.rest = lst, (front, i)
+            yield from lst
+            self.taken += len(lst)
+
+
+# concatenations of evaluated Lists at most this long are copied straight
+# away, rather than evaluated as the result is (see List.__add__)
+__concat_copy__ = 64
+
+# types whose instance of Eq is their own ==, which agrees with their hash, so
+# that elements of these types (or tuples of them) can be found by hashing
+__hashed_types__ = frozenset((int, float, complex, bool, str, bytes))
+
+# evaluated Lists at least this long are indexed by hashing their elements
+# when they are searched (see List.position), rather than scanned
+__index_min__ = 32
+
+
 class List(collections.abc.Sequence, Hask):
     """
     Statically typed lazy sequence datatype.
 
     See help(L) for more information.
+
+    A List is made of three parts: elements added to the front of it with ^,
+    the evaluated elements of its head, and its unevaluated tail. The first
+    two are persistent, so that consing onto a List or taking a suffix of it
+    (e.g. with xs[1:], as in pattern matching on m.x ^ m.xs) shares the
+    structure of the original instead of copying it:
+
+    - the consed elements are kept, last first, in a Python list (the cells)
+      that may be shared by several Lists, each of which only uses a prefix of
+      it. Consing onto the List that uses all of the cells appends to them;
+      consing onto any other List copies its prefix first.
+    - the head may be shared by several Lists, each of which starts at some
+      offset into it. Lists sharing a head also share its tail, so elements
+      evaluated by any of them are seen by all. Slices of the evaluated part
+      of a List (e.g. xs[2:5], as in take and splitAt) are shared in the same
+      way, by Lists that also stop at some offset into the head.
+
+    Concatenating Lists with + does not copy them either: the result's tail
+    runs through the Lists one after another, and further concatenations onto
+    either end of a result that is not yet fully evaluated extend that one
+    flat sequence of Lists, in constant time.
+
+    Elements are taken from the tail in blocks, each of which is type checked
+    in one pass: as many elements as are needed at once (e.g. to index the
+    List), but no fewer than the List's chunk size. A chunk size of 1, the
+    default, never evaluates an element before it is needed, which matters
+    when the tail is expensive to compute or has side effects; cheap tails,
+    such as bounded arithmetic sequences, can be given a larger chunk size to
+    cut the cost of forcing them one element at a time.
+
+    Evaluated elements are normally kept for as long as the List is, so that
+    they are only computed once. To process a long or infinite stream in
+    constant memory, a List can instead be given a window: it then keeps only
+    the last window elements it has evaluated (or the last chunk of them, if
+    that is larger), and elements before those can no longer be accessed.
+    Functions that build a List from the elements of another (e.g. map and
+    filter), and prefixes and other forward slices of it, build a List with
+    the same window, so whole pipelines stream. The length of such a List is
+    only known once it has been evaluated (e.g. by iterating over it, as
+    length does), since evaluating it to count its elements would drop the
+    ones at its front.
+
+    The head of a List of ints or floats can be stored compactly, in an
+    array.array of machine integers or doubles rather than a list of Python
+    objects. A List given its elements up front is stored this way whenever
+    they are all ints that fit in 64 bits or all floats, as is an arithmetic
+    sequence of such ints; other Lists can ask for it with compact=True.
+    Sums, maxima, membership tests, slices and comparisons of compact Lists
+    work on the array directly.
+
+    Args:
+        head: a sequence of elements, evaluated straight away
+        tail: an iterable of elements, evaluated as they are needed
+        chunk: the least number of elements to take from the tail at a time
+        window: the number of evaluated elements to keep, or None to keep all
+                of them
+        compact: True to store the elements compactly, False not to, or None
+                 to do so if the List has no tail and its head allows it.
+                 Ignored if the List has a window
+
+    Raises:
+        ValueError, if chunk or window is less than 1
+        TypeError, if compact is True and the elements are not all ints or
+                   all floats
+        OverflowError, if compact is True and an int does not fit in 64 bits
     """
-    def __init__(self, head=None, tail=None):
-        self.__head = []
+    def __init__(self, head=None, tail=None, chunk=1, window=None,
+                 compact=None):
+        if chunk < 1:
+            raise ValueError("List chunk size must be at least 1")
+        elif window is not None and window < 1:
+            raise ValueError("List window must be at least 1")
+        self.__cells = None
+        self.__ncells = 0
+        self.__head = [] if window is None else __window__()
+        self.__window = window
+        self.__offset = 0
+        # where a slice of the head ends (see __getitem__); None if the List
+        # runs on to the end of the head and then its tail
+        self.__stop = None
+        # the tail, if the List is a concatenation of Lists (see __add__)
+        self.__concat = None
+        # hash indexes of the elements, or of their first components, keyed
+        # by whether they are of the latter (see position)
+        self.__indexes = None
         self.__tail = itertools.chain([])
         self.__is_evaluated = True
+        self.__chunk = chunk
+        self.__compact = compact if window is None else False
+        # the Python type shared by all elements, if that alone determines
+        # their type (see type_witness); None if elements must be unified
+        self.__witness = None
 
         if head is not None and len(head) > 0:
-            fst = head[0]
-            for fst, other in zip(itertools.repeat(fst), head):
-                unify(typeof(fst), typeof(other))
-            self.__head.extend(head)
+            self.__witness = type_witness(head[0])
+            packed = None
+            if self.__compact or (self.__compact is None and tail is None):
+                packed = self.__pack(head)
+            if packed is not None:
+                self.__head = packed
+            else:
+                self.__head.extend(head)
+                if window is not None:
+                    self.__head.first = head[0]
+                if typechecking(outside_typed_code()):
+                    for other in head:
+                        self.__check(other)
         if tail is not None:
             self.__tail = itertools.chain(self.__tail, tail)
             self.__is_evaluated = False
         return
 
     def __type__(self):
-        if self.__is_evaluated:
-            if len(self.__head) == 0:
+        if self.__evaluated() == 0:
+            if self.__is_evaluated:
                 return ListType(TypeVariable())
-            return ListType(typeof(self[0]))
-
-        elif len(self.__head) == 0:
-            self.__next()
+            tail = self.__concat
+            if tail is not None and not tail.started and \
+                    tail.first() is not None:
+                # leave the concatenation unevaluated, so it can be extended
+                return typeof(tail.first())
+            self.__force(1)
             return self.__type__()
 
-        return ListType(typeof(self[0]))
+        return ListType(typeof(self.__sample()))
+
+    def buffer(self):
+        """
+        If the List is stored compactly, evaluate all of it and return the
+        array its elements are stored in. The array must not be modified.
+
+        Returns:
+            An array.array, or None if the List is not stored compactly
+        """
+        if not (self.__compact or type(self.__head) is array.array):
+            return None
+        self.__evaluate()
+        head = self.__head
+        if type(head) is not array.array or self.__ncells:
+            return None
+        elif self.__offset or self.__stop is not None:
+            return head[self.__offset:self.__end()]
+        return head
+
+    @property
+    def window(self):
+        """
+        The number of evaluated elements the List keeps, or None if it keeps
+        all of them (see List).
+        """
+        return self.__window
+
+    def derive(self, tail):
+        """
+        A new List of the elements of tail, evaluated with the same window as
+        this List, for functions that build one List from the elements of
+        another.
+
+        Args:
+            tail: an iterable of elements, usually computed from this List
+
+        Returns:
+            A new List
+        """
+        return List(tail=tail, window=self.__window)
+
+    def position(self, x, keyed=False):
+        """
+        The index of the first element of the List equal to x (by ==, as in
+        Eq), evaluating the List only as far as that element. Once the whole
+        List has been evaluated, a long List whose elements are ints, floats,
+        complex numbers, bools, strings, bytes or tuples of them is searched
+        through a hash index of its elements, built the first time it is
+        needed.
+
+        Args:
+            x: the element to look for
+            keyed: True to look for an element whose first component (the key
+                   of a pair, as in lookup) is equal to x instead
+
+        Returns:
+            The index of the element, or None if there is no such element
+        """
+        index = self.__index(keyed)
+        if index is not None and x == x:
+            if not (type(x) in __hashed_types__ or self.__hashed(x)):
+                # not equal to any element of the index
+                return None
+            return index.get(x)
+
+        for i, item in enumerate(self):
+            if (item[0] if keyed else item) == x:
+                return i
+        return None
+
+    def __index(self, keyed):
+        """
+        The hash index of the elements (or of their first components, if
+        keyed), mapping each to the index of the first element it belongs to;
+        or None if the List cannot be indexed yet. The index is rebuilt if more
+        elements have been evaluated since it was built.
+        """
+        if not self.__is_evaluated or self.__window is not None:
+            return None
+        n = self.__evaluated()
+        if n < __index_min__:
+            return None
+        indexes = self.__indexes
+        if indexes is None:
+            indexes = self.__indexes = {}
+        elif keyed in indexes and indexes[keyed][0] == n:
+            return indexes[keyed][1]
+
+        items = self.__items()
+        keys = [item[0] for item in items] if keyed else items
+        if not set(map(type, keys)) <= __hashed_types__ and \
+                not all(self.__hashed(k) for k in keys):
+            index = None
+        else:
+            index = dict(zip(reversed(keys), range(n - 1, -1, -1)))
+        indexes[keyed] = (n, index)
+        return index
+
+    @staticmethod
+    def __hashed(x):
+        """
+        Whether x is of a type whose == agrees with its hash, as in Eq.
+        """
+        if type(x) is tuple:
+            return all(List.__hashed(y) for y in x)
+        return type(x) in __hashed_types__
+
+    def __share(self, cells, ncells, offset, witness):
+        """
+        Returns a new List sharing the head and tail of this one.
+        """
+        lst = List(chunk=self.__chunk)
+        lst.__window = self.__window
+        lst.__compact = self.__compact
+        lst.__cells = cells
+        lst.__ncells = ncells
+        lst.__head = self.__head
+        lst.__offset = offset
+        lst.__stop = self.__stop
+        lst.__concat = self.__concat
+        lst.__tail = self.__tail
+        lst.__is_evaluated = self.__is_evaluated
+        lst.__witness = witness
+        return lst
+
+    def __sample(self):
+        """
+        An element of the List, which must have been evaluated, whose type is
+        the type of all of its elements.
+        """
+        if self.__ncells:
+            return self.__cells[self.__ncells - 1]
+        elif self.__window is not None:
+            return self.__head.first
+        return self.__head[self.__offset]
+
+    def __base(self):
+        """
+        The number of elements dropped from the front of the head (see
+        window); offsets into the head count these elements too.
+        """
+        return 0 if self.__window is None else self.__head.dropped
+
+    def __dropped(self, i):
+        return IndexError("Element %d of the List is no longer available, "
+                          "since it is evaluated with a window of %d" %
+                          (i, self.__window))
+
+    def __end(self):
+        """
+        The offset into the head of the end of the List's evaluated elements.
+        """
+        if self.__stop is None:
+            return self.__base() + len(self.__head)
+        return self.__stop
+
+    def __evaluated(self):
+        """
+        The number of elements of the List evaluated so far, including any
+        that have been dropped.
+        """
+        return self.__ncells + self.__end() - self.__offset
+
+    def __items(self):
+        """
+        The elements of the List evaluated so far, as a Python list.
 
-    def __next(self):
+        Raises:
+            IndexError, if some of them have been dropped (see window)
         """
-        Evaluate the next element of the tail, and add it to the head.
+        head = self.__head
+        start = self.__offset - self.__base()
+        if start < 0:
+            raise self.__dropped(self.__ncells)
+        elif self.__stop is not None:
+            head = head[start:self.__stop]
+        elif start or self.__window is not None:
+            head = head[start:]
+        if self.__ncells:
+            if type(head) is array.array:
+                head = head.tolist()
+            return self.__cells[self.__ncells - 1::-1] + head
+        return head
+
+    def __join(self, other):
         """
-        if self.__is_evaluated:
-            raise StopIteration
+        The elements of this List and then of other evaluated so far.
+        """
+        mine, theirs = self.__items(), other.__items()
+        codes = (getattr(xs, "typecode", None) for xs in (mine, theirs))
+        if len(set(codes)) != 1:
+            return list(mine) + list(theirs)
+        return mine + theirs
+
+    def __pack(self, items):
+        """
+        Store items, a sequence of elements, compactly (see List).
+
+        Returns:
+            An array.array, or None if compact is None and the items cannot be
+            stored compactly
+
+        Raises:
+            TypeError, OverflowError: if compact is True and the items cannot
+                be stored compactly
+        """
+        code = __compact_typecodes__.get(type(items[0]))
+        if type(items) is array.array:
+            same = items.typecode == code
         else:
-            try:
-                next_iter = next(self.__tail)
-                if len(self.__head) > 0:
-                    unify(typeof(self[0]), typeof(next_iter))
-                self.__head.append(next_iter)
-            except StopIteration:
+            same = code is not None and len(set(map(type, items))) == 1
+        if not same:
+            if self.__compact:
+                raise TypeError("List elements of type %s cannot be stored "
+                                "compactly" % type(items[0]).__name__)
+            return None
+
+        packed = array.array(code)
+        try:
+            packed.extend(items)
+        except OverflowError:
+            if self.__compact:
+                raise
+            return None
+        return packed
+
+    def __store(self, block):
+        """
+        Add block, a list of elements just taken from the tail, to the head.
+        """
+        head = self.__head
+        if type(head) is array.array:
+            witness = self.__witness
+            if len(set(map(type, block))) != 1 or \
+                    type(block[0]) is not witness:
+                # keep the elements that can be stored, as in __force
+                head.extend(item for item in block if type(item) is witness)
+                wrong = [item for item in block if type(item) is not witness]
+                raise TypeError("List elements of type %s cannot be stored "
+                                "compactly" % type(wrong[0]).__name__)
+        elif self.__compact and len(head) == 0:
+            self.__head = self.__pack(block)
+            return
+        head.extend(block)
+        return
+
+    def __trim(self):
+        """
+        Drop the elements of the head that are outside of the window.
+        """
+        if self.__window is None:
+            return
+        head = self.__head
+        extra = len(head) - max(self.__window, self.__chunk)
+        if extra > 0:
+            del head[:extra]
+            head.dropped += extra
+        return
+
+    def __force(self, n):
+        """
+        Evaluate the List until at least n elements have been evaluated, or
+        the whole List if it is shorter. Elements are taken from the tail in
+        one block, of at least the List's chunk size, and added to the head.
+        """
+        need = n - self.__evaluated()
+        if need <= 0 or self.__is_evaluated:
+            return
+
+        size = max(need, self.__chunk)
+        while size > 0:
+            # with a window, take no more elements at a time than are kept,
+            # and if stored compactly, do not box them all at once
+            step = size if self.__window is None and not self.__compact \
+                else min(size, max(self.__window or 0, self.__chunk, 1024))
+            block = list(itertools.islice(self.__tail, step))
+            if not block:
                 self.__is_evaluated = True
+                return
+
+            if self.__evaluated() == 0:
+                self.__witness = type_witness(block[0])
+                if self.__window is not None:
+                    self.__head.first = block[0]
+            taken, error = len(block), None
+            if typechecking(False):
+                # keep the elements of the right type even if some are not,
+                # so that only the others are lost
+                block, error = self.__check_block(block)
+            if block:
+                self.__store(block)
+                self.__trim()
+            if error is not None:
+                raise error
+            elif taken < step:
+                self.__is_evaluated = True
+                return
+            size -= step
+        return
+
+    def __check_block(self, block):
+        """
+        Check that every element of block has the same type as the first
+        element of the List, in one pass if they are all of the witness type.
+
+        Returns:
+            The elements of block that do, and the TypeError raised for the
+            first that does not (or None if they all do)
+        """
+        witness = self.__witness
+        if witness is not None and len(set(map(type, block))) == 1 and \
+                type(block[0]) is witness:
+            return block, None
+        first = block[0] if self.__evaluated() == 0 else self.__sample()
+        typed, error = [], None
+        for item in block:
+            if type(item) is not witness:
+                try:
+                    unify(typeof(first), typeof(item))
+                except TypeError as e:
+                    error = error or e
+                    continue
+            typed.append(item)
+        return typed, error
+
+    def __check(self, item):
+        """
+        Check that item has the same type as the first element of the List.
+        """
+        if type(item) is not self.__witness:
+            unify(typeof(self.__sample()), typeof(item))
+        return
+
+    def __check_element(self, x):
+        """
+        Check that x could be an element of the List.
+        """
+        if self.__witness is None or type(x) is not self.__witness:
+            unify(self.__type__(), ListType(typeof(x)))
         return
 
     def __evaluate(self):
         """
         Evaluate the entire List.
         """
-        while not self.__is_evaluated:
-            self.__next()
+        self.__force(sys.maxsize)
         return
 
     def __rxor__(self, item):
@@ -225,9 +783,18 @@ class List(collections.abc.Sequence, Hask):
         ^ is the cons operator (equivalent to : in Haskell)
         """
         unify(self.__type__(), ListType(typeof(item)))
-        if self.__is_evaluated:
-            return List(head=[item] + self.__head)
-        return List(head=[item] + self.__head, tail=self.__tail)
+        cells, n = self.__cells, self.__ncells
+        if cells is not None and len(cells) == n:
+            cells.append(item)
+            if cells[n] is not item:
+                # another List was consed onto the same cells first
+                cells = None
+        else:
+            cells = None
+        if cells is None:
+            cells = self.__cells[:n] if n else []
+            cells.append(item)
+        return self.__share(cells, n + 1, self.__offset, type_witness(item))
 
     def __add__(self, other):
         """
@@ -237,67 +804,87 @@ class List(collections.abc.Sequence, Hask):
         for Python lists
         """
         unify(self.__type__(), typeof(other))
-        if self.__is_evaluated and other.__is_evaluated:
-            return List(head=self.__head + other.__head)
-        elif self.__is_evaluated and not other.__is_evaluated:
-            return List(head=self.__head + other.__head,
-                        tail=other.__tail)
-        return List(head=self.__head,
-                    tail=itertools.chain(self.__tail, iter(other)))
+        if self.__is_evaluated and other.__is_evaluated and \
+                self.__evaluated() + other.__evaluated() <= __concat_copy__:
+            return List(head=self.__join(other))
+
+        mine, theirs = self.__split(), other.__split()
+        if mine is not None:
+            tail, first, front, start = mine
+            lists = [other] if theirs is None else \
+                theirs[1] + theirs[0].segments(theirs[2], theirs[3])
+            tail = tail.extend(first, front, start, lists)
+        elif theirs is not None:
+            tail, first, front, start = theirs
+            tail = tail.extend([self] + first, front, start, [])
+        else:
+            tail = __concatenation__(None, [self, other], 0, 2)
+        lst = List(tail=tail, chunk=self.__chunk, window=self.__window)
+        lst.__concat = tail
+        return lst
+
+    def __split(self):
+        """
+        If the List is a concatenation of Lists (see __add__), the parts that
+        another concatenation of it can be made from, so as not to nest one
+        concatenation inside another; or else None.
+
+        The parts are the List's tail and a Python list of Lists, followed by
+        the front and start of the Lists in the tail that the List has not
+        taken any elements from yet. The Python list shares the elements that
+        the List has already taken, and the rest of the List being taken from.
+        """
+        tail = self.__concat
+        if tail is None or self.__is_evaluated or self.__window is not None:
+            return None
+        first = []
+        if self.__evaluated():
+            first.append(self.__slice(0, self.__evaluated()))
+        if not tail.started:
+            return tail, first, tail.front, tail.start
+
+        current = tail.current
+        if current is None or current.__window is not None:
+            return None
+        taken = self.__end() - tail.taken
+        if not current.__is_evaluated or taken < current.__evaluated():
+            first.append(current.__slice(taken, None))
+        return (tail, first) + tail.rest
 
     def __str__(self):
-        if len(self.__head) == 0 and self.__is_evaluated:
+        if self.__offset < self.__base():
+            # show the elements that are still kept
+            body = ", ".join((show(s) for s in self.__head))
+            return "L[..., %s]" % body if self.__is_evaluated else \
+                "L[..., %s ...]" % body
+
+        items = self.__items()
+        if len(items) == 0 and self.__is_evaluated:
             return "L[[]]"
 
-        elif len(self.__head) == 1 and self.__is_evaluated:
-            return "L[[%s]]" % show(self.__head[0])
+        elif len(items) == 1 and self.__is_evaluated:
+            return "L[[%s]]" % show(items[0])
 
-        body = ", ".join((show(s) for s in self.__head))
+        body = ", ".join((show(s) for s in items))
         return "L[%s]" % body if self.__is_evaluated else "L[%s ...]" % body
 
     def __cmp__(self, other):
-        if self.__is_evaluated and other.__is_evaluated:
-            return cmp(self.__head, other.__head)
-
-        elif len(self.__head) >= len(other.__head):
-            # check the evaluated heads
-            heads = zip(self.__head[:len(other.__head)], other.__head)
-            heads_comp = ((cmp(h1, h2) for h1, h2 in heads))
-            for comp in heads_comp:
-                if comp != 0:
-                    return comp
-
-            # evaluate the shorter-headed list until it is the same size
-            while len(self.__head) > len(other.__head):
-                if other.__is_evaluated:
-                    return 1
-                other.__next()
-                comp = cmp(self.__head[len(other.__head)-1], other.__head[-1])
-                if comp != 0:
-                    return comp
-
-            # evaluate the tails, checking each time
-            while not self.__is_evaluated or not other.__is_evaluated:
-                if not self.__is_evaluated:
-                    self.__next()
-                if not other.__is_evaluated:
-                    other.__next()
-
-                len_comp = cmp(len(self.__head), len(other.__head))
-                if len_comp != 0:
-                    return len_comp
-
-                if len(self.__head) > 0:
-                    value_comp = cmp(self.__head[-1], other.__head[-1])
-                    if value_comp != 0:
-                        return value_comp
-
-        elif len(other.__head) > len(self.__head):
-            return -other.__cmp__(self)
-
+        for x, y in itertools.zip_longest(self, other, fillvalue=__end__):
+            if x is __end__:
+                return -1
+            elif y is __end__:
+                return 1
+            elif x != y:
+                return cmp(x, y)
         return 0
 
     def __eq__(self, other):
+        if isinstance(other, List) and self.__is_evaluated and \
+                other.__is_evaluated and type(self.__head) is array.array \
+                and type(other.__head) is array.array \
+                and not (self.__ncells or other.__ncells):
+            # compare the arrays in one go
+            return self.__items() == other.__items()
         return self.__cmp__(other) == 0
 
     def __lt__(self, other):
@@ -315,58 +902,178 @@ class List(collections.abc.Sequence, Hask):
         return comp in (1, 0)
 
     def __len__(self):
+        if self.__window is not None and not self.__is_evaluated:
+            # list(xs) and the like ask for the length before iterating, and
+            # fall back on iteration alone given a TypeError
+            raise TypeError("The length of a List with a window is unknown "
+                            "until the List has been evaluated")
         self.__evaluate()
-        return len(self.__head)
+        return self.__evaluated()
 
     def __iter__(self):
-        for item in self.__head:
-            yield item
+        cells = self.__cells
+        for i in range(self.__ncells - 1, -1, -1):
+            yield cells[i]
 
-        for item in self.__tail:
-            self.__head.append(item)
-            yield item
+        if self.__window is not None:
+            yield from self.__stream()
+            return
+        elif self.__stop is not None:
+            head = self.__head
+            for i in range(self.__offset, self.__stop):
+                yield head[i]
+            return
+
+        head, i = self.__head, self.__offset
+        while True:
+            while i < len(head):
+                yield head[i]
+                i += 1
+            if self.__is_evaluated:
+                return
+            elif self.__evaluated() == 0:
+                # the first block may replace the head (see compact)
+                self.__force(1)
+                head = self.__head
+                continue
+
+            # iteration needs the elements one at a time, so rather than go
+            # through __force, check and add each of them as it is yielded
+            # until some other user of the head evaluates it further
+            witness = self.__witness
+            for item in self.__tail:
+                if type(item) is not witness:
+                    self.__admit(item)
+                head.append(item)
+                i += 1
+                yield item
+                if i != len(head):
+                    break
+            else:
+                self.__is_evaluated = True
+                return
+
+    def __admit(self, item):
+        """
+        Check an element taken from the tail whose type is not the witness.
+        """
+        if typechecking(False):
+            unify(typeof(self.__sample()), typeof(item))
+        if type(self.__head) is array.array:
+            raise TypeError("List elements of type %s cannot be stored "
+                            "compactly" % type(item).__name__)
+        return
+
+    def __stream(self):
+        """
+        Iterate over the head of a List evaluated with a window, which drops
+        elements from its front as the List is evaluated further.
+        """
+        head, p = self.__head, self.__offset
+        while True:
+            i = p - head.dropped
+            if i < 0:
+                raise self.__dropped(self.__ncells + p - self.__offset)
+            elif i < len(head):
+                yield head[i]
+                p += 1
+            elif self.__is_evaluated:
+                return
+            else:
+                self.__force(self.__ncells + p - self.__offset + 1)
 
     def count(self, x):
-        unify(self.__type__(), ListType(typeof(x)))
+        self.__check_element(x)
         self.__evaluate()
-        return self.__head.count(x)
+        return self.__items().count(x)
 
     def index(self, x):
-        unify(self.__type__(), ListType(typeof(x)))
+        self.__check_element(x)
         self.__evaluate()
-        return self.__head.index(x)
+        return self.__items().index(x)
 
     def __contains__(self, x):
-        unify(self.__type__(), ListType(typeof(x)))
-        for item in iter(self):
-            if item is x:
-                return True
-        return False
+        self.__check_element(x)
+        if type(self.__head) is array.array:
+            # the elements are numbers, so compare them by value
+            if self.__is_evaluated and not self.__ncells:
+                return x in self.__items()
+            return any(item == x for item in self)
+        return self.position(x) is not None
 
     def __getitem__(self, ix):
         is_slice = isinstance(ix, slice)
         if is_slice:
+            if self.__window is not None and \
+                    (ix.stop is not None or ix.step is not None) and \
+                    all(x is None or x >= 0 for x in (ix.start, ix.stop)) and \
+                    (ix.step is None or ix.step > 0):
+                # evaluating a windowed List up to the end of the slice would
+                # drop its front, so take the slice's elements as they stream
+                return self.derive(
+                    itertools.islice(self, ix.start, ix.stop, ix.step))
             i = ix.start if ix.stop is None else ix.stop
         else:
             i = ix
+            if 0 <= i < self.__ncells:
+                return self.__cells[self.__ncells - 1 - i]
 
         # make sure that the list is evaluated enough to do the indexing, but
         # not any more than necessary
         # if index is negative, evaluate the entire list
         if (not isinstance(i, type(None))) and (i >= 0):
-            while (i+1) > len(self.__head):
-                try:
-                    self.__next()
-                except StopIteration:
-                    break
+            self.__force(i if is_slice else i + 1)
         else:
             self.__evaluate()
 
         if is_slice:
+            start = 0 if ix.start is None else ix.start
+            if ix.step is None and start >= 0 and (ix.stop is None or
+                    ix.stop > self.__ncells and self.__window is None):
+                # a suffix, or a slice ending in the head, shares the
+                # structure of the List
+                return self.__slice(start, ix.stop)
+
+            items = self.__items()
             if ix.stop is None and not self.__is_evaluated:
-                return List(head=self.__head[ix], tail=self.__tail)
-            return List(head=self.__head[ix])
-        return self.__head[i]
+                return List(head=items[ix], tail=self.__tail,
+                            chunk=self.__chunk, window=self.__window,
+                            compact=self.__compact)
+            return List(head=items[ix])
+
+        if i < 0 and self.__window is not None:
+            i += self.__evaluated()
+        if i >= 0:
+            j = self.__offset + i - self.__ncells
+            if j >= self.__end():
+                raise IndexError("List index out of range")
+            elif j < self.__base():
+                raise self.__dropped(i)
+            return self.__head[j - self.__base()]
+        return self.__items()[i]
+
+    def __slice(self, start, stop):
+        """
+        The elements of the List from start on, up to stop if it is not None,
+        as a List sharing its structure. The List must already be evaluated
+        up to stop, which must be past its cells.
+        """
+        if self.__compact and type(self.__head) is list and \
+                not self.__head and not self.__is_evaluated:
+            # the first block taken from the tail replaces the head with an
+            # array (see __store), so take it before the head is shared
+            self.__force(1)
+        if start <= self.__ncells:
+            lst = self.__share(self.__cells, self.__ncells - start,
+                               self.__offset, self.__witness)
+        else:
+            offset = min(self.__offset + start - self.__ncells, self.__end())
+            lst = self.__share(None, 0, offset, self.__witness)
+        if stop is not None:
+            lst.__stop = max(min(self.__offset + stop - self.__ncells,
+                                 self.__end()), lst.__offset)
+            lst.__is_evaluated = True
+        return lst
 
 
 ## Basic typeclass instances for list
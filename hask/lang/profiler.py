@@ -0,0 +1,309 @@
+import threading
+import time
+
+from . import type_system
+from .type_system import TypedCallable
+from .type_system import BulkApplication
+from .type_system import Composition
+
+
+#=============================================================================#
+# Type checking profiler
+
+
+class FunctionStats(object):
+    """
+    Timings collected for one typed function. All times are in seconds.
+
+    Attributes:
+        calls: number of calls, including partial applications
+        typeof: time spent computing the types of arguments and results
+        analyze: time spent in type inference (cached inferences are free)
+        unify: time spent unifying results with their inferred types
+        body: time spent in the wrapped Python function, including any typed
+              functions it calls in turn
+        total: time spent in calls to the function, from start to finish
+    """
+    columns = ("calls", "total", "body", "check", "typeof", "analyze",
+               "unify")
+
+    def __init__(self):
+        self.calls = 0
+        self.typeof = 0.0
+        self.analyze = 0.0
+        self.unify = 0.0
+        self.body = 0.0
+        self.total = 0.0
+
+    @property
+    def check(self):
+        """Time spent in hask's type machinery, rather than in the body"""
+        return self.total - self.body
+
+
+class _Frame(object):
+    """One typed call in progress on the current thread"""
+    __slots__ = ("stats", "in_body", "timing")
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.in_body = False
+        self.timing = False
+
+
+def describe(fn):
+    """
+    Returns a (filename, line number, name) triple identifying a typed
+    function, in the format used by the profile and pstats modules.
+    """
+    func = fn.func
+    if isinstance(fn, type):
+        return ("~", 0, fn.__name__)
+    elif isinstance(func, Composition):
+        return ("~", 0, "<composition of %d functions>" % len(func.stages))
+
+    name = getattr(func, "__qualname__", getattr(fn, "__name__", repr(fn)))
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return ("~", 0, name)
+    return (code.co_filename, code.co_firstlineno, name)
+
+
+class TypeProfiler(object):
+    """
+    Opt-in profiler for the overhead of runtime type checking.
+
+    While enabled, every call of a TypedFunc or data constructor (including
+    functions built with sig, annotated, constraint and **) is timed, and the
+    time spent in typeof, analyze and unify is separated from the time spent
+    in the body of the function. Partial applications, calls made by map,
+    filter and the like (see bulk) and calls of specialized functions (see
+    specialize) are counted against the function they were applied to. Only one
+    profiler may be enabled at a time; when no profiler is enabled, typed calls
+    are not affected at all.
+
+    Usage:
+
+        with TypeProfiler() as prof:
+            ...
+        print(prof.report(sort="check"))
+        pstats.Stats(prof).sort_stats("tottime").print_stats()
+    """
+    __active__ = [None]
+
+    def __init__(self):
+        self.functions = {}
+        self.__local = threading.local()
+        self.__saved = None
+
+    #-------------------------------------------------------------------------#
+    # Enabling and disabling
+
+    def enable(self):
+        """
+        Start profiling typed calls.
+
+        Raises:
+            RuntimeError, if another TypeProfiler is already enabled
+        """
+        if TypeProfiler.__active__[0] is not None:
+            raise RuntimeError("A TypeProfiler is already enabled")
+        TypeProfiler.__active__[0] = self
+
+        self.__saved = (TypedCallable.__call__, BulkApplication.__call__,
+                        type_system.typeof, type_system.analyze,
+                        type_system.unify)
+
+        TypedCallable.__call__ = self.__wrap_call(TypedCallable.__call__)
+        type_system.__invoke_hook__[0] = self.__body
+        BulkApplication.__call__ = self.__wrap_bulk(BulkApplication.__call__)
+        type_system.__specialized_hook__[0] = self.__specialized_call
+        type_system.typeof = self.__wrap_phase(type_system.typeof, "typeof")
+        type_system.analyze = self.__wrap_phase(type_system.analyze,
+                                                "analyze")
+        type_system.unify = self.__wrap_phase(type_system.unify, "unify")
+        return
+
+    def disable(self):
+        """
+        Stop profiling typed calls. The statistics collected so far are kept.
+        """
+        if TypeProfiler.__active__[0] is not self:
+            return
+        (TypedCallable.__call__, BulkApplication.__call__,
+         type_system.typeof, type_system.analyze,
+         type_system.unify) = self.__saved
+        type_system.__invoke_hook__[0] = None
+        type_system.__specialized_hook__[0] = None
+        TypeProfiler.__active__[0] = None
+        return
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.disable()
+        return
+
+    #-------------------------------------------------------------------------#
+    # Instrumentation
+
+    def __frames(self):
+        try:
+            return self.__local.frames
+        except AttributeError:
+            self.__local.frames = []
+            return self.__local.frames
+
+    def __stats(self, fn):
+        """The statistics of a typed function, or of the one it applies"""
+        root = fn if fn.__root__ is None else fn.__root__
+        stats = self.functions.get(root)
+        if stats is None:
+            stats = self.functions.setdefault(root, FunctionStats())
+        return stats
+
+    def __timed(self, stats, call, *args, **kwargs):
+        """Time call(*args, **kwargs) as a call of the function with stats"""
+        frames = self.__frames()
+        frames.append(_Frame(stats))
+        start = time.perf_counter()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            stats.total += time.perf_counter() - start
+            stats.calls += 1
+            frames.pop()
+
+    def __body(self, body):
+        """Wrap body, the function called by a typed call, to time it"""
+        def profiled_body(*args, **kwargs):
+            frame = self.__frames()[-1]
+            frame.in_body = True
+            start = time.perf_counter()
+            try:
+                return body(*args, **kwargs)
+            finally:
+                frame.stats.body += time.perf_counter() - start
+                frame.in_body = False
+        return profiled_body
+
+    def __wrap_call(self, call):
+        def profiled_call(o, *w, **kw):
+            stats = self.__stats(o)
+            frames = self.__frames()
+            if frames and frames[-1].stats is stats and \
+                    not frames[-1].in_body:
+                # a bulk application checking a call in full (see bulk), which
+                # is already being timed
+                return call(o, *w, **kw)
+            return self.__timed(stats, call, o, *w, **kw)
+        return profiled_call
+
+    def __wrap_bulk(self, call):
+        def profiled_bulk(app, *w):
+            raw = app.raw
+            app.raw = self.__body(raw)
+            try:
+                return self.__timed(self.__stats(app.fn), call, app, *w)
+            finally:
+                app.raw = raw
+        return profiled_bulk
+
+    def __specialized_call(self, generic, body, check, args):
+        """
+        Call a specialized function (see specialize) whose arguments passed
+        its guards: body applies the typed function generic to args, and
+        check checks its result.
+        """
+        def call():
+            result = self.__body(body)(*args)
+            frame = self.__frames()[-1]
+            frame.timing = True
+            start = time.perf_counter()
+            try:
+                return check(result)
+            finally:
+                frame.stats.unify += time.perf_counter() - start
+                frame.timing = False
+        return self.__timed(self.__stats(generic), call)
+
+    def __wrap_phase(self, fn, phase):
+        def profiled_phase(*args):
+            frames = self.__frames()
+            if not frames or frames[-1].in_body or frames[-1].timing:
+                return fn(*args)
+
+            frame = frames[-1]
+            frame.timing = True
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                setattr(frame.stats, phase,
+                        getattr(frame.stats, phase) + elapsed)
+                frame.timing = False
+        return profiled_phase
+
+    #-------------------------------------------------------------------------#
+    # Reporting
+
+    def report(self, sort="total", limit=None):
+        """
+        Format the collected statistics as a table.
+
+        Args:
+            sort: the column to sort by, in descending order: one of "calls",
+                  "total", "body", "check", "typeof", "analyze" or "unify"
+            limit: the maximum number of functions to include, or None
+
+        Returns: The report, as a string
+
+        Raises:
+            ValueError, if sort is not a column of the report
+        """
+        if sort not in FunctionStats.columns:
+            raise ValueError("Cannot sort by %s; expected one of %s" %
+                             (sort, ", ".join(FunctionStats.columns)))
+
+        rows = sorted(self.functions.items(),
+                      key=lambda item: getattr(item[1], sort), reverse=True)
+        lines = ["%8s %10s %10s %10s %10s %10s %10s  %s" %
+                 (FunctionStats.columns + ("function",))]
+        for fn, stats in rows[:limit]:
+            filename, line, name = describe(fn)
+            where = name if line == 0 else "%s:%d(%s)" % (filename, line, name)
+            lines.append("%8d %10.6f %10.6f %10.6f %10.6f %10.6f %10.6f  %s" %
+                         (stats.calls, stats.total, stats.body, stats.check,
+                          stats.typeof, stats.analyze, stats.unify, where))
+        return "\n".join(lines)
+
+    def create_stats(self):
+        """
+        Build the .stats dictionary, so that the profiler can be loaded with
+        pstats.Stats. Each typed function is reported with its type checking
+        overhead as its own time (tottime) and the whole call as its
+        cumulative time; typeof, analyze and unify appear as separate entries
+        called by the functions that spent time in them.
+        """
+        self.stats = {}
+        phases = dict((phase, {}) for phase in ("typeof", "analyze", "unify"))
+
+        for fn, stats in self.functions.items():
+            key = describe(fn)
+            self.stats[key] = (stats.calls, stats.calls, stats.check,
+                               stats.total, {})
+            for phase, callers in phases.items():
+                elapsed = getattr(stats, phase)
+                if elapsed > 0:
+                    callers[key] = (stats.calls, stats.calls, elapsed, elapsed)
+
+        for phase, callers in phases.items():
+            if callers:
+                elapsed = sum(c[2] for c in callers.values())
+                calls = sum(c[0] for c in callers.values())
+                self.stats[("~", 0, "<hask %s>" % phase)] = \
+                    (calls, calls, elapsed, elapsed, callers)
+        return
@@ -2,6 +2,7 @@ import inspect
 import operator
 import string
 import sys
+import threading
 import warnings
 from collections import deque, defaultdict
 
@@ -12,8 +13,7 @@ from hask.lang.type_system import TypeSignature
 from hask.lang.type_system import TypeSignatureHKT
 from hask.lang.type_system import ADT
 from hask.lang.type_system import build_ADT
-from hask.lang.type_system import build_sig
-from hask.lang.type_system import make_fn_type
+from hask.lang.type_system import build_typed_func
 from hask.lang.type_system import PatternMatchBind
 from hask.lang.type_system import PatternMatchListBind
 from hask.lang.type_system import pattern_match
@@ -209,9 +209,38 @@ class sig(Syntax):
         return
 
     def __call__(self, fn):
-        fn_args = build_sig(self.sig)
-        fn_type = make_fn_type(fn_args)
-        return TypedFunc(fn, fn_args, fn_type)
+        return build_typed_func(fn, self.sig)
+
+
+def dispatch(typeclass, method, arg=0):
+    """
+    Decorator for typed functions that just forward their arguments to a
+    method of a typeclass, chosen by the type of one of the arguments, i.e.
+    whose body is `return typeclass[args[arg]].method(*args)`.
+
+    Calls of the function then skip its body: the implementation of the method
+    for each concrete type is looked up once and cached, and called directly,
+    without going through the instance's own type-checked wrapper (the
+    function's signature has already been checked for the call).
+
+    Usage:
+
+    @dispatch(Num, "negate")
+    @sig(H[(Num, "a")]/ "a" >> "a")
+    def negate(a):
+        return Num[a].negate(a)
+
+    Args:
+        typeclass: The typeclass whose method the function forwards to
+        method: The name of the method
+        arg: The index of the argument that selects the instance
+    """
+    def decorator(fn):
+        if not isinstance(fn, TypedFunc):
+            raise TypeError("dispatch can only be applied to typed functions")
+        fn.__specialize__ = (typeclass, method, arg)
+        return fn
+    return decorator
 
 
 def t(type_constructor, *params):
@@ -273,7 +302,8 @@ undefined = __undefined__()
 
 # Constructs for pattern matching.
 # Note that the approach implemented here uses lots of global state and is
-# pretty much the opposite of "functional" or "thread-safe."
+# pretty much the opposite of "functional." The state is kept per thread, so
+# that pattern matching is at least thread-safe.
 
 class IncompletePatternError(Exception):
     pass
@@ -289,24 +319,33 @@ class MatchStackFrame(object):
 
 class MatchStack(object):
     """Stack for storing locally bound variables from matches"""
-    __stack__ = deque()
+    __local__ = threading.local()
+
+    @classmethod
+    def get_stack(cls):
+        """Access the current thread's stack"""
+        try:
+            return cls.__local__.stack
+        except AttributeError:
+            cls.__local__.stack = deque()
+            return cls.__local__.stack
 
     @classmethod
     def push(cls, value):
         """Push a new frame onto the stack, representing a new case expr"""
-        cls.__stack__.append(MatchStackFrame(value))
+        cls.get_stack().append(MatchStackFrame(value))
         return
 
     @classmethod
     def pop(cls):
         """Pop the current frame off the stack"""
-        cls.__stack__.pop()
+        cls.get_stack().pop()
         return
 
     @classmethod
     def get_frame(cls):
         """Access the current frame"""
-        return cls.__stack__[-1]
+        return cls.get_stack()[-1]
 
     @classmethod
     def get_name(cls, name):
@@ -735,23 +774,35 @@ class __section__(Syntax):
         super().__init__(syntax_err_msg)
         return
 
+    # the signatures of sections are only parsed once
+    __single_sig = sig(H/ "a" >> "b")
+    __double_sig = sig(H/ "a" >> "b" >> "c")
+
     @staticmethod
-    def __make_section(fn):
+    def __make_section(op, flipped=False, single_sig=__single_sig,
+                       double_sig=__double_sig):
         """
-        Create an operator section from a binary operator.
+        Create an operator section from a binary operator, with its operands
+        swapped if flipped. The section remembers the operator it applies in
+        its __operator__ attribute (see TypedCallable), as (op, flipped,
+        bound operands).
         """
+        fn = (lambda x, y: op(y, x)) if flipped else op
+
         def section_wrapper(self, y):
             # double section, e.g. (__+__)
             if isinstance(y, __section__):
-                @sig(H/ "a" >> "b" >> "c")
+                @double_sig
                 def double_section(a, b):
                     return fn(a, b)
+                double_section.__operator__ = (op, flipped, ())
                 return double_section
 
             # single section, e.g. (__+1) or (1+__)
-            @sig(H/ "a" >> "b")
+            @single_sig
             def section(a):
                 return fn(a, y)
+            section.__operator__ = (op, flipped, (y,))
             return section
         return section_wrapper
 
@@ -759,7 +810,7 @@ class __section__(Syntax):
     __wrap = __make_section.__func__
 
     # right section, e.g. (1+__)
-    __flip = lambda f: lambda x, y: f(y, x)
+    __flip = lambda op, wrap=__wrap: wrap(op, flipped=True)
 
     __add__ = __wrap(operator.add)
     __sub__ = __wrap(operator.sub)
@@ -782,19 +833,19 @@ class __section__(Syntax):
     __ge__ = __wrap(operator.ge)
     __le__ = __wrap(operator.le)
 
-    __radd__ = __wrap(__flip(operator.add))
-    __rsub__ = __wrap(__flip(operator.sub))
-    __rmul__ = __wrap(__flip(operator.mul))
-    __rtruediv__ = __wrap(__flip(operator.truediv))
-    __rfloordiv__ = __wrap(__flip(operator.floordiv))
-    __rmod__ = __wrap(__flip(operator.mod))
-    __rdivmod__ = __wrap(__flip(divmod))
-    __rpow__ = __wrap(__flip(operator.pow))
-    __rlshift__ = __wrap(__flip(operator.lshift))
-    __rrshift__ = __wrap(__flip(operator.rshift))
-    __ror__ = __wrap(__flip(operator.or_))
-    __rand__ = __wrap(__flip(operator.and_))
-    __rxor__ = __wrap(__flip(operator.xor))
+    __radd__ = __flip(operator.add)
+    __rsub__ = __flip(operator.sub)
+    __rmul__ = __flip(operator.mul)
+    __rtruediv__ = __flip(operator.truediv)
+    __rfloordiv__ = __flip(operator.floordiv)
+    __rmod__ = __flip(operator.mod)
+    __rdivmod__ = __flip(divmod)
+    __rpow__ = __flip(operator.pow)
+    __rlshift__ = __flip(operator.lshift)
+    __rrshift__ = __flip(operator.rshift)
+    __ror__ = __flip(operator.or_)
+    __rand__ = __flip(operator.and_)
+    __rxor__ = __flip(operator.xor)
 
 
 __ = __section__("Error in section")
@@ -1,17 +1,27 @@
+import contextvars
 import functools
+import itertools
+import operator
+import os
 import types
 import string
 import sys
+import threading
 import builtins
+import weakref
 from collections import namedtuple
+from collections import OrderedDict
 
 from .hindley_milner import TypeVariable
 from .hindley_milner import TypeOperator
 from .hindley_milner import Var
 from .hindley_milner import App
-from .hindley_milner import Lam
 from .hindley_milner import unify
 from .hindley_milner import analyze
+from .hindley_milner import fresh
+from .hindley_milner import ground
+from .hindley_milner import prune
+from .hindley_milner import TypeScheme
 from .hindley_milner import Function
 from .hindley_milner import Tuple
 from .hindley_milner import ListType
@@ -68,18 +78,80 @@ class TypeMeta(type):
         super(TypeMeta, self).__init__(*args)
         self.__instances__ = {}
         self.__dependencies__ = self.mro()[1:-2] # excl self, Typeclass, object
+        # instance found for each Python type looked up so far, and methods
+        # specialized for each Python type; cleared by build_instance
+        # whenever an instance is added
+        self.__dispatch__ = {}
+        self.__specialized__ = {}
 
     def __getitem__(self, item):
-        try:
-            if isinstance(item, ADT):
-                return self.__instances__[id(item.__type_constructor__)]
-            elif isinstance(typeof(item), ListType):
-                return self.__instances__[id(type(item))]
-            elif isinstance(item, Hask):
-                return self.__instances__[id(typeof(item))]
-            return self.__instances__[id(type(item))]
-        except KeyError:
-            raise TypeError("No instance for {0}".format(item))
+        methods = self.__dispatch__.get(type(item))
+        if methods is None:
+            methods = self.lookup(type(item))
+            if methods is None:
+                raise TypeError("No instance for {0}".format(item))
+        return methods
+
+    def lookup(self, cls):
+        """
+        Returns the methods of the instance of this typeclass for a Python
+        type, or for an ADT's type constructor: its own instance, or one it
+        inherits (see __resolve). Instances found are cached per type.
+
+        Args:
+            cls: the class or type to look up
+
+        Returns: The instance's methods, or None if there is no instance
+        """
+        methods = self.__dispatch__.get(cls)
+        if methods is None:
+            methods = self.__resolve(cls)
+            if methods is not None:
+                self.__dispatch__[cls] = methods
+        return methods
+
+    def specialize(self, item, name):
+        """
+        Returns the function implementing a method of this typeclass for the
+        type of item, ready to be called directly. If the instance method is a
+        TypedFunc, its underlying function is returned, since it is only meant
+        to be called from a typed function whose signature was already checked
+        (see dispatch). Results are cached per Python type.
+
+        Args:
+            item: a value whose type determines the instance
+            name: the name of the method
+
+        Returns: The function implementing the method
+
+        Raises:
+            TypeError, if the type of item has no instance of this typeclass
+        """
+        key = (type(item), name)
+        fn = self.__specialized__.get(key)
+        if fn is None:
+            fn = getattr(self[item], name)
+            if isinstance(fn, TypedFunc) and fn.__root__ is None:
+                fn = fn.func
+            self.__specialized__[key] = fn
+        return fn
+
+    def __resolve(self, cls):
+        """
+        Find the instance of this typeclass for a Python type: the instance of
+        the type constructor for ADTs, or else the instance of the first class
+        in the type's MRO that has one.
+
+        Returns: The instance's methods, or None if there is no instance
+        """
+        if issubclass(cls, ADT):
+            tcon = getattr(cls, "__type_constructor__", cls)
+            return self.__instances__.get(id(tcon))
+        for base in cls.__mro__:
+            methods = self.__instances__.get(id(base))
+            if methods is not None:
+                return methods
+        return None
 
 
 class Typeclass(object, metaclass=TypeMeta):
@@ -127,18 +199,22 @@ def build_instance(typeclass, cls, attrs):
     """
     # 1) check dependencies
     for dep in typeclass.__dependencies__:
-        if id(cls) not in dep.__instances__:
+        if dep.lookup(cls) is None:
             raise TypeError("Missing dependency: %s" % dep.__name__)
 
     # 2) add type and its instance method to typeclass's instance dictionary
     __methods__ = namedtuple("__%s__" % str(id(cls)), attrs.keys())(**attrs)
     typeclass.__instances__[id(cls)] = __methods__
+    typeclass.__dispatch__.clear()
+    typeclass.__specialized__.clear()
     return
 
 
 def has_instance(cls, typeclass):
     """
-    Test whether a class is a member of a particular typeclass.
+    Test whether a class is a member of a particular typeclass, either through
+    its own instance or one it inherits from a base class (as Typeclass[x]
+    finds it).
 
     Args:
         cls: The class or type to test for membership
@@ -147,9 +223,9 @@ def has_instance(cls, typeclass):
     Returns:
         True if cls is a member of typeclass, and False otherwise.
     """
-    if not issubclass(typeclass, Typeclass):
+    if not issubclass(typeclass, Typeclass) or not isinstance(cls, type):
         return False
-    return id(cls) in typeclass.__instances__
+    return typeclass.lookup(cls) is not None
 
 
 #=============================================================================#
@@ -188,6 +264,43 @@ class PyFunc(object):
     pass
 
 
+# typeof() dispatches on type(obj). Types whose instances all have the same
+# (ground) type map straight to it in __typeof_constants__; all others map to
+# a handler in __typeof_handlers__. Both tables are filled in on first sight of
+# a type, and the builtin scalars are known in advance.
+__typeof_constants__ = dict(
+    [(t, TypeOperator(t, [])) for t in
+     (int, float, complex, bool, str, bytes, bytearray, range, slice)] +
+    [(t, TypeOperator(PyFunc, [])) for t in __python_function_types__] +
+    [(type(None), TypeOperator(None, []))])
+__typeof_handlers__ = {}
+
+
+def __typeof_dispatch(cls):
+    """
+    Find out how to compute typeof() for instances of a Python type, and record
+    it in the dispatch tables.
+
+    Args:
+        cls: The type of the object being inspected
+
+    Returns:
+        A function taking an instance of cls and returning its type
+    """
+    if issubclass(cls, Hask):
+        handler = operator.methodcaller("__type__")
+    elif issubclass(cls, TypeConstructor):
+        handler = operator.attrgetter("fn_type")
+    elif issubclass(cls, tuple):
+        handler = lambda obj: Tuple(list(map(typeof, obj)))
+    else:
+        constant = TypeOperator(cls, [])
+        __typeof_constants__[cls] = constant
+        return lambda obj: constant
+    __typeof_handlers__[cls] = handler
+    return handler
+
+
 def typeof(obj):
     """
     Returns the type of an object within the internal type system.
@@ -199,24 +312,165 @@ def typeof(obj):
         An object representing the type in the internal type system language
         (i.e., a TypeOperator or TypeVariable)
     """
-    TypeVariable.next_var_name = 'a'
+    cls = type(obj)
+    constant = __typeof_constants__.get(cls)
+    if constant is not None:
+        return constant
+
+    TypeVariable.reset_names()
+    handler = __typeof_handlers__.get(cls)
+    if handler is None:
+        handler = __typeof_dispatch(cls)
+    return handler(obj)
+
+
+def type_witness(obj):
+    """
+    Returns the Python type of an object if every instance of that type has
+    the same (ground) type in the internal type system, so that a check of
+    `type(x) is witness` can stand in for unification against typeof(obj).
+
+    Args:
+        obj: the object to inspect
+
+    Returns:
+        The Python type of obj, or None if typeof() depends on the value of obj
+    """
+    cls = type(obj)
+    if typeof(obj) is __typeof_constants__.get(cls):
+        return cls
+    return None
+
+
+#=============================================================================#
+# Type checking levels
+
+
+class TypeCheckLevel(namedtuple("TypeCheckLevel", ("mode", "rate"))):
+    """
+    How thoroughly typed functions and Lists are checked at runtime:
+
+    full      every TypedFunc call is inferred and every List element unified
+    boundary  only TypedFunc calls made from outside another typed function,
+              and Lists built outside of typed functions, are checked; lazily
+              forced List elements are trusted
+    sample:N  one in every N checks is performed
+    off       no checks are performed
+    """
+    def __str__(self):
+        if self.mode == "sample":
+            return "sample:%d" % self.rate
+        return self.mode
+
+
+def parse_typecheck_level(level):
+    """
+    Parse a type checking level specification.
+
+    Args:
+        level: one of "full", "boundary", "sample:N" or "off", or an instance
+               of TypeCheckLevel
+
+    Returns: A TypeCheckLevel
+
+    Raises:
+        ValueError, if the specification is invalid
+    """
+    if isinstance(level, TypeCheckLevel):
+        return level
+
+    mode, _, rate = str(level).strip().lower().partition(":")
+    if mode in ("full", "boundary", "off") and not rate:
+        return TypeCheckLevel(mode, 1)
+    elif mode == "sample" and rate.isdigit() and int(rate) > 0:
+        return TypeCheckLevel(mode, int(rate))
+    raise ValueError("Invalid type checking level: %s" % level)
+
+
+__typecheck_level__ = [parse_typecheck_level(
+    os.environ.get("HASK_TYPECHECK", "full"))]
+__typecheck_scope__ = contextvars.ContextVar("hask_typecheck", default=None)
+__typecheck_depth__ = contextvars.ContextVar("hask_typecheck_depth", default=0)
+__typecheck_samples__ = itertools.count()
+
+# a function wrapping the underlying function of every typed call before it is
+# called while a TypeProfiler is enabled, or None (see TypedCallable)
+__invoke_hook__ = [None]
+
+
+def get_typecheck():
+    """
+    Returns the type checking level currently in effect, as a TypeCheckLevel.
+    """
+    return __typecheck_scope__.get() or __typecheck_level__[0]
+
+
+def set_typecheck(level):
+    """
+    Set the global type checking level (the default is taken from the
+    HASK_TYPECHECK environment variable, or "full" if it is unset). Levels set
+    with `typecheck` blocks take precedence.
 
-    if isinstance(obj, Hask):
-        return obj.__type__()
+    Args:
+        level: "full", "boundary", "sample:N" or "off"
+    """
+    __typecheck_level__[0] = parse_typecheck_level(level)
+    return
 
-    elif isinstance(obj, TypeConstructor):
-        return obj.fn_type
 
-    elif isinstance(obj, tuple):
-        return Tuple(list(map(typeof, obj)))
+class typecheck(object):
+    """
+    Context manager that sets the type checking level for the code run inside
+    of it (in the current thread or task only).
+
+    Usage:
 
-    elif obj is None:
-        return TypeOperator(None, [])
+    with typecheck("off"):
+        hot_loop()
 
-    elif type(obj) in __python_function_types__:
-        return TypeOperator(PyFunc, [])
+    with typecheck("sample:100"):
+        serve_requests()
+    """
+    def __init__(self, level):
+        self.level = parse_typecheck_level(level)
+        self.__tokens = []
 
-    return TypeOperator(type(obj), [])
+    def __enter__(self):
+        self.__tokens.append(__typecheck_scope__.set(self.level))
+        return self.level
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        __typecheck_scope__.reset(self.__tokens.pop())
+        return False
+
+
+def typechecking(at_boundary):
+    """
+    Decide whether a check should be performed under the current type checking
+    level.
+
+    Args:
+        at_boundary: whether the check guards the boundary between untyped
+                     code and typed code
+
+    Returns: True if the check should be performed, and False otherwise
+    """
+    level = __typecheck_scope__.get() or __typecheck_level__[0]
+    if level.mode == "full":
+        return True
+    elif level.mode == "off":
+        return False
+    elif level.mode == "boundary":
+        return at_boundary
+    return next(__typecheck_samples__) % level.rate == 0
+
+
+def outside_typed_code():
+    """
+    Returns True unless called (directly or indirectly) from the body of a
+    typed function that was checked at the "boundary" type checking level.
+    """
+    return __typecheck_depth__.get() == 0
 
 
 class TypeSignature(object):
@@ -228,6 +482,8 @@ class TypeSignature(object):
     def __init__(self, args, constraints):
         self.args = args
         self.constraints = constraints
+        # (TypeScheme, number of args) once looked up by build_fn_type
+        self.template = None
 
 
 class TypeSignatureHKT(object):
@@ -332,33 +588,371 @@ def build_sig(type_signature, var_dict=None):
     return [build_sig_arg(i, cons, var_dict) for i in args]
 
 
-class TypedCallable:
-    def __call__(o, *w, **kw):
-        # the environment contains the type of the function and the types
-        # of the arguments
-        rho = {id(x) : typeof(x) for x in w}
-        rho[id(o)] = o.fn_type
+class TypeCache(object):
+    """
+    Bounded mapping with least-recently-used eviction, used to remember the
+    results of type inference so that repeated calls with the same argument
+    types can skip the Hindley-Milner machinery entirely. Safe to share between
+    threads: only writes take the lock, so that hits never contend for it (the
+    hits and misses counters are then approximate under concurrent use).
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key):
+        entries = self.__entries
+        try:
+            value = entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        try:
+            entries.move_to_end(key)
+        except KeyError:
+            # evicted by another thread since it was read
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+        return
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+        return
+
+
+__call_cache__ = TypeCache()
+
+
+def __signature_key(arg, cons):
+    """
+    A hashable key describing the structure of a type signature argument, such
+    that arguments with equal keys are converted to the same types (up to the
+    renaming of type variables) by build_sig_arg.
+    """
+    if isinstance(arg, str):
+        return (str, arg, tuple(cons[arg]) if arg in cons else ())
+    elif isinstance(arg, TypeSignature):
+        return (TypeSignature,) + __signature_shape(arg)
+    elif isinstance(arg, TypeSignatureHKT):
+        return (TypeSignatureHKT, __signature_key(arg.tcon, cons)) + \
+            tuple(__signature_key(a, cons) for a in arg.params)
+    elif isinstance(arg, tuple):
+        return (tuple,) + tuple(__signature_key(a, cons) for a in arg)
+    elif isinstance(arg, list):
+        return (list,) + tuple(__signature_key(a, cons) for a in arg)
+    return arg
+
+
+def __signature_shape(type_signature):
+    cons = type_signature.constraints
+    return tuple(__signature_key(arg, cons) for arg in type_signature.args)
+
 
-        apexpr = Var(id(o))
+__signature_cache__ = TypeCache()
 
+
+def build_fn_type(type_signature):
+    """
+    Convert a TypeSignature into the argument types and the function type of a
+    TypedFunc, as build_sig and make_fn_type would, but without re-parsing
+    signatures seen before: the types built for a signature are kept as a
+    template, shared by all signatures of the same structure, and copied with
+    new type variables on every call.
+
+    Args:
+        type_signature: an instance of TypeSignature
+
+    Returns: A tuple of the list of argument types (including the return type)
+             and the function type
+
+    Raises: TypeSignatureError, if the signature cannot be converted
+    """
+    template = type_signature.template
+    if template is None:
+        try:
+            key = __signature_shape(type_signature)
+            template = __signature_cache__.get(key)
+        except TypeError:
+            # unhashable item in the signature
+            key = None
+
+        if template is None:
+            fn_args = build_sig(type_signature)
+            template = (TypeScheme(make_fn_type(fn_args)), len(fn_args))
+            if key is not None:
+                __signature_cache__.put(key, template)
+        type_signature.template = template
+
+    scheme, nargs = template
+    fn_type = scheme.instantiate(constraints=True)
+    fn_args = []
+    result = fn_type
+    for _ in range(nargs - 1):
+        fn_args.append(result.types[0])
+        result = result.types[1]
+    fn_args.append(result)
+    return fn_args, fn_type
+
+
+def build_typed_func(fn, type_signature):
+    """
+    Wrap a function in a TypedFunc with the type given by a TypeSignature (see
+    build_fn_type). The TypedFunc remembers the signature template its type
+    was copied from, so that the results of type inference for it are shared
+    with all functions whose signatures have the same structure.
+
+    Args:
+        fn: the function to wrap
+        type_signature: an instance of TypeSignature
+
+    Returns: A TypedFunc
+
+    Raises: TypeSignatureError, if the signature cannot be converted
+    """
+    fn_args, fn_type = build_fn_type(type_signature)
+    res = TypedFunc(fn, fn_args, fn_type)
+    res.__type_scheme__ = TypeScheme(fn_type)
+    res.__template__ = (type_signature.template, res.__type_scheme__)
+    return res
+
+
+class Composition(object):
+    """
+    The underlying function of a composed TypedFunc: a flat list of stages,
+    called one after the other in a loop. Composing with a TypedFunc that is
+    itself a composition splices its stages in, rather than nesting calls.
+
+    The type of the composition is only inferred when it is first needed
+    (e.g. by the first call of the TypedFunc), from the types of all of the
+    typed functions making it up at once, and is then kept; so a chain such
+    as f * g * h is inferred once, rather than once for each *.
+    """
+    __slots__ = ("stages", "functions", "fn_type")
+
+    def __init__(self, stages, functions):
+        self.stages = stages
+        self.functions = functions
+        self.fn_type = None
+
+    @staticmethod
+    def stages_of(fn):
+        """
+        The stages making up a TypedCallable, in the order they are called.
+        """
+        if isinstance(fn.func, Composition):
+            return fn.func.stages
+        return (fn.func,)
+
+    @staticmethod
+    def functions_of(fn):
+        """
+        The typed functions making up a TypedCallable, in the order they are
+        called.
+        """
+        if isinstance(fn.func, Composition):
+            return fn.func.functions
+        return (fn,)
+
+    def infer(self):
+        """
+        The type of the composition, inferred on first use.
+
+        Raises: TypeError, if the types of the stages do not line up
+        """
+        if self.fn_type is None:
+            # apply the type of each function to the result type of the one
+            # before it, as analyze would for a nested application, but
+            # without recursing once for every stage
+            arg = result = TypeVariable()
+            for fn in self.functions:
+                applied = TypeVariable()
+                unify(Function(result, applied),
+                      fn._TypedCallable__scheme().instantiate())
+                result = applied
+            self.fn_type = Function(arg, result)
+        return self.fn_type
+
+    def __call__(self, x):
+        for stage in self.stages:
+            x = stage(x)
+        return x
+
+
+class TypedCallable:
+    # A partial application remembers the callable it was split off of
+    # (__root__), the arguments bound so far, and the ground types of those
+    # arguments (None if any of them was not ground or was never checked)
+    __root__ = None
+    __bound_args__ = ()
+    __bound_kwargs__ = {}
+    __bound_types__ = ()
+    # TypeScheme of fn_type, built on first use (see __scheme)
+    __type_scheme__ = None
+    # (signature template, TypeScheme of fn_type) if fn_type was copied from
+    # the template shared by all signatures of its structure (see
+    # build_typed_func)
+    __template__ = None
+    # (typeclass, method name, argument index) if calls are forwarded
+    # straight to a typeclass method (see syntax.dispatch)
+    __specialize__ = None
+    # (operator, flipped, bound operands) if this is an operator section
+    # (see syntax.__section__)
+    __operator__ = None
+
+    def __call__(o, *w, **kw):
+        # the type checking level is handled, and the underlying function is
+        # called, in this frame rather than in helper methods (those that are
+        # used return before the function is called), so that typed functions
+        # can recurse as deeply as they could before levels existed
         for argval in w:
             if isinstance(argval, Undefined):
                 return argval
 
-            apexpr = App(apexpr, Var(id(argval)))
+        level = __typecheck_scope__.get() or __typecheck_level__[0]
+        mode, token = level.mode, None
+        if mode == "full":
+            checked = True
+        elif mode == "boundary":
+            checked = __typecheck_depth__.get() == 0
+            if checked:
+                token = __typecheck_depth__.set(1)
+        else:
+            checked = mode == "sample" and \
+                next(__typecheck_samples__) % level.rate == 0
 
-        rettyp = analyze(apexpr, rho)
+        try:
+            nargs = len(o.fn_args) - 1
+            if checked:
+                rettyp, keys = o.__infer([typeof(x) for x in w])
+                if nargs != len(w):
+                    return o.__partial(w, kw, rettyp, keys)
+            elif nargs > len(w):
+                # peel the applied arguments off of the function type
+                rettyp = o.fn_type
+                for _ in w:
+                    rettyp = prune(rettyp).types[1]
+                return o.__partial(w, kw, rettyp, None)
+
+            # call the underlying function with all arguments bound so far
+            if o.__root__ is None:
+                root, args = o, w
+            else:
+                root, args = o.__root__, o.__bound_args__ + w
+                if o.__bound_kwargs__:
+                    kw = dict(o.__bound_kwargs__, **kw)
+
+            fn = root.func
+            if root.__specialize__ is not None and not kw:
+                typeclass, name, i = root.__specialize__
+                fn = typeclass.specialize(args[i], name)
+            if __invoke_hook__[0] is not None:
+                fn = __invoke_hook__[0](fn)
+            retval = fn(*args, **kw)
+
+            if checked:
+                unify(rettyp, typeof(retval))
+            return retval
+        finally:
+            if token is not None:
+                __typecheck_depth__.reset(token)
 
-        if len(o.fn_args) - 1 == len(w):
-            retval = o.func(*w, **kw)
-            unify(rettyp, typeof(retval))
+    def __partial(o, w, kw, rettyp, keys):
+        """
+        Partially apply this function. The result refers back to the root
+        function rather than to this one, so that chains of applications such
+        as f(a)(b)(c) neither nest partials nor lose track of the argument
+        types already checked.
+        """
+        root = o if o.__root__ is None else o.__root__
+        args = o.__bound_args__ + w
+        kwargs = dict(o.__bound_kwargs__, **kw)
+
+        fn = TypedFunc(functools.partial(root.func, *args, **kwargs),
+                       o.fn_args[len(w):], rettyp)
+        fn.__root__ = root
+        fn.__bound_args__ = args
+        fn.__bound_kwargs__ = kwargs
+        fn.__bound_types__ = keys
+        return fn
+
+    def __infer(o, arg_types):
+        """
+        Infer the type of applying this function to arguments of the given
+        types. Results for ground (interned) argument types are memoised in
+        __call_cache__, keyed on the type of the root function and the types of
+        all the arguments bound to it, so that partial applications share
+        entries with full ones; non-ground cached results are handed out as
+        fresh copies so that callers may unify them freely.
+
+        The type of the root function is its signature template while its
+        type is still the copy of the template, so that all functions with
+        signatures of the same structure (e.g. every section) share entries;
+        otherwise it is a weak reference to the root function, which the cache
+        must not keep alive.
+
+        Returns: the inferred type, and the key tuple of ground argument types
+                 (or None if there is none)
+        """
+        keys = tuple(ground(t) for t in arg_types)
+        if o.__bound_types__ is None or None in keys:
+            return o.__analyze(arg_types), None
+
+        keys = o.__bound_types__ + keys
+        root = o if o.__root__ is None else o.__root__
+        template = root.__template__
+        if template is not None and template[1].type is root.fn_type and \
+                template[1].valid():
+            key = (template[0], keys)
+        else:
+            key = (weakref.ref(root), keys)
 
-            return retval
+        rettyp = __call_cache__.get(key)
+        if rettyp is None:
+            rettyp = o.__analyze(arg_types)
+            rettyp = ground(rettyp) or rettyp
+            __call_cache__.put(key, rettyp)
+        return (rettyp if rettyp.is_ground else fresh(rettyp, set())), keys
+
+    def __scheme(o):
+        """
+        The type of this function as a TypeScheme, rebuilt if fn_type has been
+        replaced or changed by unification since it was last built.
+        """
+        scheme = o.__type_scheme__
+        if scheme is None or scheme.type is not o.fn_type or \
+                not scheme.valid():
+            scheme = TypeScheme(o.fn_type)
+            o.__type_scheme__ = scheme
+        return scheme
+
+    def __analyze(o, arg_types):
+        # the environment contains the type of the function and the types
+        # of the arguments
+        rho = dict(enumerate(arg_types))
+        rho["fn"] = o.__scheme()
 
-        return TypedFunc(
-            functools.partial(o.func, *w, **kw),
-            o.fn_args[len(w):], rettyp
-        )
+        apexpr = Var("fn")
+        for i in range(len(arg_types)):
+            apexpr = App(apexpr, Var(i))
+
+        return analyze(apexpr, rho)
 
     def __mul__(f, g):
         """
@@ -368,20 +962,20 @@ class TypedCallable:
         """
 
         if isinstance(g, TypedCallable):
-            rho = {id(f) : f.fn_type, id(g) : g.fn_type}
-            comexpr = Lam("arg", App(Var(id(f)), App(Var(id(g)), Var("arg"))))
-
-            newtype = analyze(comexpr, rho)
             newargs = [g.fn_args[0]] + f.fn_args[1:]
 
+            # the type is left to be inferred when it is needed (see
+            # Composition)
             return TypedFunc(
-                lambda x: f.func(g.func(x)),
-                fn_args = newargs, fn_type = newtype
+                Composition(Composition.stages_of(g) +
+                            Composition.stages_of(f),
+                            Composition.functions_of(g) +
+                            Composition.functions_of(f)),
+                fn_args = newargs, fn_type = None
             )
         else:
             return g.__rmul__(f)
 
-
     def __mod__(self, x):
         """
         (%) :: (a -> b) -> a -> b
@@ -401,8 +995,17 @@ class TypedFunc(TypedCallable, Hask):
         self.__doc__ = fn.__doc__
         self.func    = fn
         self.fn_args = fn_args
-        self.fn_type = fn_type
-
+        if fn_type is not None or not isinstance(fn, Composition):
+            self.fn_type = fn_type
+
+    def __getattr__(self, name):
+        # only called for missing attributes: the type of a composition is
+        # inferred when it is first needed (see Composition)
+        if name == "fn_type" and \
+                isinstance(self.__dict__.get("func"), Composition):
+            self.fn_type = self.func.infer()
+            return self.fn_type
+        raise AttributeError(name)
 
     def __type__(self):
         return self.fn_type
@@ -412,6 +1015,218 @@ class TypeConstructor(TypedCallable, type):
     pass
 
 
+#=============================================================================#
+# Bulk application
+
+
+class BulkApplication(object):
+    """
+    A typed function prepared to be applied to every element of a list (see
+    bulk). The first call with arguments of each combination of Python types
+    is checked in full, and its argument types are remembered as a witness;
+    later calls whose arguments have the same Python types call the underlying
+    function directly, and only check that the result has the expected type.
+    Arguments whose type depends on their value (e.g. ADTs, tuples, Lists) are
+    checked in full on every call.
+    """
+    __slots__ = ("fn", "raw", "arity", "known")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.arity = len(fn.fn_args) - 1
+        self.known = {}
+
+        root = fn if fn.__root__ is None else fn.__root__
+        if root.__specialize__ is not None and not fn.__bound_kwargs__:
+            typeclass, name, i = root.__specialize__
+            bound = fn.__bound_args__
+            self.raw = lambda *w: \
+                typeclass.specialize((bound + w)[i], name)(*(bound + w))
+        else:
+            self.raw = fn.func
+
+    def __call__(self, *w):
+        entry = self.known.get(tuple(map(type, w)))
+        if entry is None:
+            return self.__check(w)
+
+        rtype, rettyp = entry
+        retval = self.raw(*w)
+        if type(retval) is not rtype:
+            if not rettyp.is_ground:
+                rettyp = fresh(rettyp, set())
+            unify(rettyp, typeof(retval))
+        return retval
+
+    def __check(self, w):
+        """
+        Check a call in full, recording the types of its arguments if they
+        can serve as a witness for later calls.
+        """
+        if len(w) != self.arity:
+            return self.fn(*w)
+        arg_types = [typeof(x) for x in w]
+        for x, arg_type in zip(w, arg_types):
+            if arg_type is not __typeof_constants__.get(type(x)):
+                return self.fn(*w)
+
+        rettyp, _ = self.fn._TypedCallable__infer(arg_types)
+        retval = self.raw(*w)
+        unify(rettyp, typeof(retval))
+        self.known[tuple(map(type, w))] = (type_witness(retval), rettyp)
+        return retval
+
+
+def bulk(fn):
+    """
+    Prepare a function to be applied to many elements in a row, e.g. by map
+    or filter: the type of a typed function is checked against the Python
+    types of its arguments once, rather than on every call, and re-checked
+    only for arguments of other types. Functions other than typed functions
+    are returned unchanged, as are typed functions while type checking is
+    relaxed (see typecheck), since their calls are not checked in full anyway.
+
+    Args:
+        fn: the function to prepare
+
+    Returns: A callable equivalent to fn
+    """
+    if not isinstance(fn, TypedCallable):
+        return fn
+    level = __typecheck_scope__.get() or __typecheck_level__[0]
+    if level.mode != "full":
+        return fn
+    return BulkApplication(fn)
+
+
+#=============================================================================#
+# Monomorphic specialization
+
+
+def __monotype(cls):
+    """
+    Returns the type in the internal type system shared by all instances of a
+    Python type.
+
+    Raises:
+        TypeError, if the type of an instance of cls depends on its value
+    """
+    constant = __typeof_constants__.get(cls)
+    if constant is None and cls not in __typeof_handlers__:
+        __typeof_dispatch(cls)
+        constant = __typeof_constants__.get(cls)
+    if constant is None:
+        raise TypeError("Cannot specialize on {0}: the type of its instances "
+                        "depends on their value".format(cls.__name__))
+    return constant
+
+
+def __fn_name(fn):
+    """
+    A short name for a typed function, for use in generated code.
+    """
+    return getattr(fn.func, "__qualname__", None) or \
+        getattr(fn.func, "__name__", None) or type(fn.func).__name__
+
+
+# the function that calls of specialized functions are passed to while a
+# TypeProfiler is enabled, or None (see specialize)
+__specialized_hook__ = [None]
+
+
+def specialize(fn, *types):
+    """
+    Build a monomorphic version of a typed function, for calls whose argument
+    types are known in advance.
+
+    The type of applying fn to arguments of the given Python types is
+    inferred once, here. The result is a plain Python function, generated with
+    compile(), that checks each argument with an inlined `type(x) is T` guard
+    before calling the body, and checks the result against the inferred type
+    without calling analyze. Calls whose arguments fail the guards are passed
+    on to fn itself, and checked as usual. The guards are checked at every
+    type checking level.
+
+    Usage:
+
+        add = (lambda x, y: x + y) ** (H/ int >> int >> int)
+        add_ints = specialize(add, int, int)
+        add_ints(1, 2)      # 3, without any type inference
+        add_ints(1.0, 2)    # falls back to add, which raises a TypeError
+
+    Args:
+        fn: a TypedFunc or partial application of one
+        *types: the Python type of each remaining argument of fn
+
+    Returns: A function taking exactly len(types) positional arguments
+
+    Raises:
+        TypeError, if fn is not a TypedFunc, if the number of types does not
+        match the arity of fn, if a type's instances do not all share one type,
+        or if fn cannot be applied to arguments of the given types
+    """
+    if not isinstance(fn, TypedFunc):
+        raise TypeError("Cannot specialize {0}: not a typed function"
+                        .format(fn))
+    if len(types) != len(fn.fn_args) - 1:
+        raise TypeError("Cannot specialize a function of {0} arguments on {1} "
+                        "types".format(len(fn.fn_args) - 1, len(types)))
+
+    rettyp, _ = fn._TypedCallable__infer([__monotype(t) for t in types])
+    root = fn if fn.__root__ is None else fn.__root__
+
+    params = ["a%d" % i for i in range(len(types))]
+    args = ["bound[%d]" % i for i in range(len(fn.__bound_args__))] + params
+    env = {"types": types, "bound": fn.__bound_args__,
+           "kwargs": fn.__bound_kwargs__, "func": root.func,
+           "generic": fn, "rettyp": rettyp, "constants": __typeof_constants__,
+           "typeof": typeof, "unify": unify, "fresh": fresh,
+           "hook": __specialized_hook__}
+
+    if root.__specialize__ is not None and not fn.__bound_kwargs__:
+        typeclass, name, i = root.__specialize__
+        env.update(typeclass=typeclass, name=name)
+        call = "typeclass.specialize({0}, name)({1})" \
+               .format(args[i], ", ".join(args))
+    elif fn.__bound_kwargs__:
+        call = "func({0}, **kwargs)".format(", ".join(args))
+    else:
+        call = "func({0})".format(", ".join(args))
+
+    if rettyp.is_ground:
+        check = "if constants.get(type(r)) is not rettyp:\n" \
+                "{0}    unify(rettyp, typeof(r))"
+    else:
+        check = "unify(fresh(rettyp, set()), typeof(r))"
+
+    # while a TypeProfiler is enabled, calls go through the hook instead, so
+    # that it can time the body and the check separately
+    guards = " and ".join("type({0}) is types[{1}]".format(p, i)
+                          for i, p in enumerate(params)) or "True"
+    source = ("def body({0}):\n"
+              "    return {2}\n"
+              "def check(r):\n"
+              "    {3}\n"
+              "    return r\n"
+              "def specialized({0}):\n"
+              "    if {1}:\n"
+              "        if hook[0] is not None:\n"
+              "            return hook[0](generic, body, check, ({5}))\n"
+              "        r = {2}\n"
+              "        {4}\n"
+              "        return r\n"
+              "    return generic({0})\n").format(
+                  ", ".join(params), guards, call, check.format(" " * 4),
+                  check.format(" " * 8), "".join(p + ", " for p in params))
+
+    exec(compile(source, "<specialized %s>" % __fn_name(root), "exec"), env)
+    specialized = env["specialized"]
+    specialized.__doc__ = fn.__doc__
+    specialized.__wrapped__ = fn
+    specialized.__source__ = source
+    return specialized
+
+
 #=============================================================================#
 # ADT creation
 
@@ -611,11 +1426,15 @@ def pattern_match(value, pattern, env=None):
             return pattern_match(nt_to_tuple(value), nt_to_tuple(pattern), env)
 
         elif hasattr(value, "__iter__") and (not isinstance(value, str)):
+            # take no more elements than it takes to tell that the lengths
+            # differ, since value may be a long or infinite List, or one with
+            # a window whose length is unknown
             matches = []
-            if len(value) != len(pattern):
+            items = list(itertools.islice(value, len(pattern) + 1))
+            if len(items) != len(pattern):
                 return False, env
 
-            for v, p in zip(value, pattern):
+            for v, p in zip(items, pattern):
                 match_status, env = pattern_match(v, p, env)
                 matches.append(match_status)
             return all(matches), env
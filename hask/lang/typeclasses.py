@@ -8,6 +8,7 @@ from .type_system import build_instance
 
 from .syntax import instance
 from .syntax import sig
+from .syntax import dispatch
 from .syntax import H
 
 
@@ -54,6 +55,7 @@ class Show(Typeclass):
         return
 
 
+@dispatch(Show, "show")
 @sig(H/ "a" >> str)
 def show(obj):
     """
@@ -21,6 +21,7 @@ setup(
     package_data={'': ['LICENSE', 'README.md']},
     include_package_data=True,
     install_requires=[],
+    extras_require={'numpy': ['numpy']},
     license=open('LICENSE').read(),
     zip_safe=False,
     classifiers=(
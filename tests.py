@@ -1,8 +1,17 @@
+import gc
+import io
+import itertools
 import math
+import pstats
 import sys
+import threading
 import unittest
+import warnings
+import weakref
 
-from hask import H, sig, t, func, TypeSignatureError
+from hask import H, sig, t, func, annotated, TypeSignatureError
+from hask import typecheck, get_typecheck, set_typecheck, TypeProfiler
+from hask import specialize
 from hask import p, m, caseof, IncompletePatternError
 from hask import has_instance
 from hask import guard, case, otherwise, NoGuardMatchException
@@ -13,7 +22,7 @@ from hask import Ordering, LT, EQ, GT
 from hask import Maybe, Just, Nothing, in_maybe
 from hask import Either, Left, Right, in_either
 from hask import Typeclass
-from hask import Read, Show, Eq, Ord, Bounded, Num
+from hask import Read, Show, Eq, Ord, Bounded, Enum, Num
 from hask import Functor, Applicative, Monad
 from hask import Foldable, Traversable
 from hask import Unit, Star
@@ -22,11 +31,15 @@ from hask import Unit, Star
 from hask.lang.type_system import make_fn_type
 from hask.lang.type_system import build_sig_arg, build_sig, build_ADT
 from hask.lang.type_system import typeof, pattern_match, PatternMatchBind
+from hask.lang.type_system import TypeCache, __call_cache__
+from hask.lang.type_system import build_fn_type, __signature_cache__
+from hask.lang.type_system import __typeof_constants__, __typeof_handlers__
 
 from hask.lang.hindley_milner import Var, App, Lam, Let
 from hask.lang.hindley_milner import TypeVariable, TypeOperator, Function, Tuple
 from hask.lang.hindley_milner import analyze
-from hask.lang.hindley_milner import unify
+from hask.lang.hindley_milner import ground, fresh, ListType, TypeScheme
+from hask.lang.hindley_milner import unify, prune
 
 from hask.lang.lazylist import List
 
@@ -379,6 +392,115 @@ class TestHindleyMilner(unittest.TestCase):
                     Function(TypeOperator(int, []), TypeOperator(int, [])),
                     Function(TypeOperator(int, []), TypeOperator(int, []))))
 
+    def test_type_scheme(self):
+        """Type schemes instantiate like fresh"""
+        a, b = TypeVariable(), TypeVariable()
+        fn = Function(a, Function(ListType(b), Tuple([a, self.Integer])))
+        scheme = TypeScheme(fn)
+        self.assertEqual([a, b], scheme.variables)
+
+        inst = scheme.instantiate()
+        self.assertIsInstance(inst, Function)
+        self.assertIsInstance(inst.types[1].types[0], ListType)
+        self.assertIs(self.Integer, inst.types[1].types[1].types[1])
+        self.assertIs(inst.types[0], inst.types[1].types[1].types[0])
+        self.assertNotIn(inst.types[0], (a, b))
+        self.assertIsNot(inst.types[0], scheme.instantiate().types[0])
+        TypeVariable.reset_names()
+        expected = str(fresh(fn, set()))
+        TypeVariable.reset_names()
+        self.assertEqual(expected, str(inst))
+
+        # variables occurring in non-generic types are shared
+        inst = scheme.instantiate(set([Function(TypeVariable(), b)]))
+        self.assertIs(b, inst.types[1].types[0].types[0])
+        self.assertIsNot(a, inst.types[0])
+
+        # schemes are usable in the type environment
+        env = dict(self.env, f=scheme, id=TypeScheme(self.env["id"]))
+        res = analyze(App(Var("f"), Var("4")), env)
+        self.assertIs(Tuple([self.Integer, self.Integer]),
+                      ground(prune(res).types[1]))
+        self.assertIsNone(a.instance)
+        self.assertIs(self.Bool, ground(
+            analyze(App(App(Var("id"), Var("id")), Var("True")), env)))
+        self.assertIsNone(self.var4.instance)
+
+        # binding one of the variables invalidates the scheme
+        self.assertTrue(scheme.valid())
+        unify(b, self.Bool)
+        self.assertFalse(scheme.valid())
+
+        f = (lambda x: x) ** (H/ "a" >> "a")
+        self.assertEqual(1, f(1))
+        unify(typeof(f), Function(typeof(1), typeof(1)))
+        self.assertEqual(2, f(2))
+        with self.assertRaises(te): f("a")
+
+    def test_interned_types(self):
+        """Ground types are hash-consed"""
+        self.assertIs(TypeOperator(int, []), TypeOperator(int, []))
+        self.assertIs(typeof(1), typeof(2))
+        self.assertIs(ListType(typeof(1)), TypeOperator("[]", [typeof(1)]))
+        self.assertIs(Tuple([typeof(1), typeof("a")]), typeof((1, "a")))
+        self.assertIs(Function(self.Integer, self.Bool),
+                      TypeOperator("->", [self.Integer, self.Bool]))
+        self.assertIsNot(Function(self.Integer, self.Bool),
+                         Function(self.Bool, self.Integer))
+        self.assertIsNot(Function(self.var1, self.Bool),
+                         Function(self.var1, self.Bool))
+        self.assertEqual(1, {typeof(1): 1}[TypeOperator(int, [])])
+
+        # non-ground types become ground once their variables are bound
+        var = TypeVariable()
+        ty = ListType(var)
+        self.assertIsNone(ground(ty))
+        unify(var, self.Integer)
+        self.assertIs(ListType(self.Integer), ground(ty))
+
+        # ground types are shared, not copied, by fresh
+        fn = Function(self.Integer, ListType(self.var1))
+        self.assertIs(self.Integer, fresh(fn, set()).types[0])
+        self.assertIsInstance(fresh(fn, set()).types[1], ListType)
+
+        self.unified(self.Integer, TypeOperator("int", []))
+        with self.assertRaises(te): unify(self.Integer, self.Bool)
+        with self.assertRaises(te):
+            unify(ListType(self.Integer), ListType(self.Bool))
+
+        # ground types that are no longer used are not kept alive
+        unused = weakref.ref(ListType(ListType(TypeOperator("Unused", []))))
+        gc.collect()
+        self.assertIsNone(unused())
+        self.assertIs(TypeOperator("int", []), self.Integer)
+
+    def test_deep_unification(self):
+        """Unification does not recurse on the Python stack"""
+        def nested(depth, leaf):
+            for _ in range(depth):
+                leaf = ListType(leaf)
+            return leaf
+
+        depth = sys.getrecursionlimit() * 2
+        var = TypeVariable()
+        self.unified(nested(depth, var), nested(depth, self.Integer))
+        self.assertIs(self.Integer, ground(var))
+
+        with self.assertRaises(te):
+            unify(nested(depth, Tuple([TypeVariable(), self.Bool])),
+                  nested(depth, Tuple([self.Integer, self.Integer])))
+        with self.assertRaises(te):
+            var = TypeVariable()
+            unify(var, nested(depth, var))
+
+        # long chains of variables are kept shallow
+        chain = [TypeVariable() for _ in range(depth)]
+        for v1, v2 in zip(chain, chain[1:]):
+            self.unified(v1, v2)
+        self.unified(chain[0], self.Bool)
+        self.assertIs(self.Bool, ground(chain[-1]))
+        self.assertLessEqual(max(v.rank for v in chain), 1)
+
     def test_typecheck_builtins(self):
         """Make sure builtin types typecheck correctly"""
 
@@ -441,6 +563,43 @@ class TestTypeSystem(unittest.TestCase):
         with self.assertRaises(te): f("4")
         with self.assertRaises(te): f(1, 2)
 
+    def test_TypedFunc_compose(self):
+        """Composition builds one flat pipeline of stages"""
+        f = (lambda x: x + 2) ** (H/ int >> int)
+        g = (lambda x: x * 2) ** (H/ int >> int)
+        i = (lambda x: str(x)) ** (H/ int >> str)
+        n = (lambda s: len(s)) ** (H/ str >> int)
+
+        fg = f * g
+        self.assertEqual((g.func, f.func), fg.func.stages)
+        left = fg * f * g
+        right = i * (g * fg)
+        self.assertEqual((g.func, f.func, g.func, f.func), left.func.stages)
+        self.assertEqual((g.func, f.func, g.func, i.func), right.func.stages)
+        self.assertEqual(f(g(f(g(1)))), left(1))
+        self.assertEqual("8", right(1))
+        self.assertEqual(1, (n * right)(1))
+        self.assertEqual((g.func, f.func), fg.func.stages)
+
+        long = f
+        for _ in range(sys.getrecursionlimit()):
+            long = long * f
+        self.assertEqual(2 * sys.getrecursionlimit() + 2, long(0))
+
+        with self.assertRaises(te): (n * fg)(1)
+        with self.assertRaises(te): typeof(n * fg)
+        with self.assertRaises(te): right(1.)
+        self.assertEqual(str(typeof(n * i)), "(int -> int)")
+
+        # a chain is only inferred once, when it is first needed
+        chain = n * i * f * g
+        self.assertIsNone(chain.func.fn_type)
+        self.assertEqual(1, chain(1))
+        inferred = chain.func.fn_type
+        self.assertEqual("(int -> int)", str(inferred))
+        self.assertEqual(2, chain(10))
+        self.assertIs(inferred, typeof(chain))
+
     def test_TypedFunc_var(self):
         @sig(H/ "a" >> "b" >> "a" >> "b")
         def superconst(a, b, c):
@@ -535,6 +694,380 @@ class TestTypeSystem(unittest.TestCase):
 
         self.assertEqual(1, eq_id(1))
 
+    def test_signature_cache(self):
+        s1 = (H[(Eq, "a")]/ "a" >> ["b"] >> t(Maybe, "a")).sig
+        s2 = (H[(Eq, "a")]/ "a" >> ["b"] >> t(Maybe, "a")).sig
+        s3 = (H[(Ord, "a")]/ "a" >> ["b"] >> t(Maybe, "a")).sig
+        args1, type1 = build_fn_type(s1)
+        misses = __signature_cache__.misses
+        args2, type2 = build_fn_type(s2)
+        self.assertEqual(misses, __signature_cache__.misses)
+        self.assertIs(s1.template, s2.template)
+        build_fn_type(s3)
+        self.assertIsNot(s1.template, s3.template)
+
+        # every use gets its own type variables, with their constraints
+        self.assertEqual(3, len(args1))
+        self.assertIsNot(args1[0], args2[0])
+        self.assertIs(args1[0], args1[2].types[0])
+        self.assertIs(type1.types[0], args1[0])
+        self.assertIs(type1.types[1].types[1], args1[2])
+        self.assertEqual((Eq,), tuple(args1[0].constraints))
+        TypeVariable.reset_names()
+        expected = str(make_fn_type(build_sig(s1)))
+        TypeVariable.reset_names()
+        self.assertEqual(expected, str(type1))
+        unify(args1[0], typeof(1))
+        self.assertIsNone(args2[0].instance)
+
+        ground_type = build_fn_type((H/ int >> (H/ int >> int)).sig)
+        self.assertIs(make_fn_type(build_sig((H/ int >> (H/ int >> int)).sig)),
+                      ground_type[1])
+        self.assertEqual(2, len(ground_type[0]))
+        with self.assertRaises(TypeSignatureError):
+            build_fn_type((H/ int >> "A").sig)
+
+        # sections reuse their signatures
+        misses = __signature_cache__.misses
+        self.assertEqual([2, 3, 4], [(_ + 1)(x) for x in (1, 2, 3)])
+        self.assertEqual([2, 3, 4], [(1 + _)(x) for x in (1, 2, 3)])
+        self.assertEqual(6, (_ * _)(2, 3))
+        self.assertEqual(misses, __signature_cache__.misses)
+
+    def test_call_cache(self):
+        cache = TypeCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"))
+        cache.put("c", 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(3, cache.get("c"))
+
+        @sig(H/ "a" >> "b" >> "a")
+        def const(a, b):
+            return a
+
+        hits = __call_cache__.hits
+        self.assertEqual(1, const(1, "a"))
+        self.assertEqual(2, const(2, "b"))
+        self.assertEqual(hits + 1, __call_cache__.hits)
+        self.assertEqual(1., const(1., "a"))
+        self.assertEqual(3, const(3)("c"))
+        self.assertEqual(L[[1]], const(L[[1]], L[[]]))
+
+        f = (lambda x: x + 1) ** (H/ int >> int)
+        self.assertEqual(2, f(1))
+        self.assertEqual(3, f(2))
+        with self.assertRaises(te): f(1.)
+        with self.assertRaises(te): f(1.)
+
+        g = (lambda x: x) ** (H/ int >> int)
+        self.assertEqual(1, g(1))
+        with self.assertRaises(te): g(True)
+
+        @sig(H/ int >> "a")
+        def untyped_result(x):
+            return [int, str][x](1)
+
+        self.assertEqual(1, untyped_result(0))
+        self.assertEqual("1", untyped_result(1))
+
+        # functions with signatures of the same structure share entries
+        self.assertEqual(2, (_ + 1)(1))
+        hits = __call_cache__.hits
+        self.assertEqual(3, (_ + 2)(1))
+        self.assertEqual(hits + 1, __call_cache__.hits)
+
+        # and the cache does not keep functions without a signature alive
+        h = f * g
+        self.assertEqual(2, h(1))
+        self.assertEqual(2, h(1))
+        ref = weakref.ref(h)
+        del h
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_partial_application(self):
+        calls = []
+
+        @sig(H/ int >> int >> int >> int)
+        def add3(x, y, z):
+            calls.append((x, y, z))
+            return x + y + z
+
+        self.assertEqual(6, add3(1)(2)(3))
+        hits = __call_cache__.hits
+        self.assertEqual(6, add3(1, 2)(3))
+        self.assertEqual(6, add3(1)(2, 3))
+        self.assertEqual(hits + 4, __call_cache__.hits)
+        self.assertEqual([(1, 2, 3)] * 3, calls)
+
+        part = add3(1)(2)
+        self.assertIs(add3.func, part.func.func)
+        self.assertEqual((1, 2), part.func.args)
+        self.assertEqual(6, part.func(3))
+        with self.assertRaises(te): add3(1)(2)(3.)
+        with self.assertRaises(te): add3(1)(2.)
+
+        append = (lambda xs, x: xs + L[[x]]) ** (H/ ["a"] >> "a" >> ["a"])
+        self.assertEqual(L[[1]], append(L[[]])(1))
+        self.assertEqual(L["a"], append(L[[]])("a"))
+        self.assertEqual(L[1, 2], append(L[[1]])(2))
+        with self.assertRaises(te): append(L[[1]])("a")
+
+        with typecheck("off"):
+            self.assertEqual(6., add3(1.)(2.)(3.))
+        self.assertEqual(6, add3(1)(2)(3))
+
+    def test_recursion_depth(self):
+        """A typed call adds one frame to the function's own, at every level"""
+        def depth():
+            frame, n = sys._getframe(1), 0
+            while frame is not None:
+                frame, n = frame.f_back, n + 1
+            return n
+
+        @sig(H/ int >> int >> int)
+        def down(step, n):
+            depths.append(depth())
+            return 0 if n == 0 else down(step)(n - step)
+
+        for level in ("full", "boundary", "sample:2", "off"):
+            with typecheck(level):
+                depths = []
+                self.assertEqual(0, down(1, 2))
+                self.assertEqual([2, 2], [depths[1] - depths[0],
+                                          depths[2] - depths[1]])
+
+        from hask.Data.List import foldr
+        self.assertEqual(sum(range(300)), foldr(_ + _, 0, L[range(300)]))
+
+    def test_typecheck_levels(self):
+        f = (lambda x, y: x + y) ** (H/ int >> int >> int)
+        self.assertEqual("full", str(get_typecheck()))
+        with self.assertRaises(ve): typecheck("sometimes")
+        with self.assertRaises(ve): typecheck("sample:0")
+
+        with typecheck("off"):
+            self.assertEqual("off", str(get_typecheck()))
+            self.assertEqual(3., f(1., 2.))
+            self.assertEqual(3., f(1.)(2.))
+            self.assertEqual(L[1, "a"][1], "a")
+            with self.assertRaises(te): f(1, 2, 3)
+        with self.assertRaises(te): f(1., 2.)
+
+        @sig(H/ int >> int)
+        def outer(x):
+            f(x, 1.)
+            return x
+
+        with typecheck("boundary"):
+            self.assertEqual(1, outer(1))
+            with self.assertRaises(te): outer(1.)
+            with self.assertRaises(te): L[1, "a"]
+            self.assertEqual("a", L[(x for x in (1, "a"))][1])
+        with self.assertRaises(te): outer(1)
+
+        with typecheck("sample:2"):
+            self.assertEqual("sample:2", str(get_typecheck()))
+            failures = 0
+            for _ in range(10):
+                try:
+                    f(1., 2.)
+                except TypeError:
+                    failures += 1
+            self.assertEqual(5, failures)
+
+        try:
+            set_typecheck("off")
+            self.assertEqual(3., f(1., 2.))
+            with typecheck("full"):
+                with self.assertRaises(te): f(1., 2.)
+        finally:
+            set_typecheck("full")
+        with self.assertRaises(te): f(1., 2.)
+
+    def test_profiler(self):
+        from hask.lang.type_system import TypedCallable
+        call = TypedCallable.__call__
+
+        @sig(H/ int >> int >> int)
+        def add(x, y):
+            return x + y
+
+        @annotated
+        def double(x: int) -> int:
+            return add(x, x)
+
+        with TypeProfiler() as prof:
+            with self.assertRaises(RuntimeError): TypeProfiler().enable()
+            for i in range(10):
+                double(i)
+                add(i)(1)
+                Just(i)
+            with self.assertRaises(te): double(1.)
+        self.assertIs(call, TypedCallable.__call__)
+        self.assertEqual(4, double(2))
+
+        self.assertEqual(30, prof.functions[add].calls)
+        self.assertEqual(11, prof.functions[double].calls)
+        self.assertEqual(10, prof.functions[Just].calls)
+        stats = prof.functions[double]
+        self.assertGreater(stats.body, 0)
+        self.assertGreater(stats.typeof, 0)
+        self.assertAlmostEqual(stats.total, stats.body + stats.check)
+
+        lines = prof.report(sort="calls").splitlines()
+        self.assertEqual(4, len(lines))
+        self.assertIn("add", lines[1])
+        self.assertIn("Just", lines[3])
+        self.assertEqual(2, len(prof.report(limit=1).splitlines()))
+        with self.assertRaises(ve): prof.report(sort="name")
+
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("tottime").print_stats()
+        self.assertIn(".double)", out.getvalue())
+        self.assertIn("hask typeof", out.getvalue())
+
+        # calls made by map and filter, and calls of specialized functions,
+        # are counted against the function applied
+        from hask.Data.List import map, filter
+        add_ints = specialize(add, int, int)
+        with TypeProfiler() as prof:
+            self.assertEqual(L[2, 3, 4], map(add(1), L[1, 2, 3]))
+            self.assertEqual(L[[3]], filter(_ > 2, L[1, 2, 3]))
+            for i in range(5):
+                self.assertEqual(i + 1, add_ints(i, 1))
+        stats = prof.functions[add]
+        self.assertEqual(9, stats.calls)
+        self.assertGreater(stats.body, 0)
+        self.assertGreater(stats.typeof, 0)
+        self.assertGreater(stats.unify, 0)
+        self.assertEqual(3, add_ints(1, 2))
+
+    def test_specialize(self):
+        from hask.Prelude import negate
+
+        @sig(H/ int >> int >> int)
+        def add(x, y):
+            return x + y
+
+        add_ints = specialize(add, int, int)
+        self.assertEqual(3, add_ints(1, 2))
+        self.assertEqual(3, specialize(add(1), int)(2))
+        self.assertNotIn("analyze", add_ints.__source__)
+        with self.assertRaises(te): add_ints(1., 2)
+        with self.assertRaises(te): add_ints(True, 2)
+
+        bad = (lambda x: str(x)) ** (H/ int >> int)
+        with self.assertRaises(te): specialize(bad, int)(1)
+
+        ident = (lambda x: x) ** (H/ "a" >> "a")
+        self.assertEqual("a", specialize(ident, str)("a"))
+        self.assertEqual(1, specialize(ident, str)(1))
+        self.assertEqual(Just(1), specialize(ident, int)(Just(1)))
+        self.assertEqual(-2.5, specialize(negate, float)(2.5))
+
+        with self.assertRaises(te): specialize(add, int)
+        with self.assertRaises(te): specialize(add, str, int)
+        with self.assertRaises(te): specialize(add, tuple, int)
+        with self.assertRaises(te): specialize(lambda x: x, int)
+
+    def test_bulk(self):
+        from hask.lang import bulk
+        from hask.Data.List import map, filter, foldl
+
+        f = (lambda x: x + 1) ** (H/ int >> int)
+        g = (lambda x: x if x < 3 else str(x)) ** (H/ int >> int)
+        self.assertEqual(L[2, 3, 4], map(f, L[1, 2, 3]))
+        self.assertEqual(L[2, 3], filter((_ > 1) ** (H/ int >> bool),
+                                         L[1, 2, 3]))
+        self.assertEqual(6, foldl((_ + _) ** (H/ int >> int >> int), 0,
+                                  L[1, 2, 3]))
+        self.assertEqual(Just(1), map(Just, L[[1]])[0])
+        self.assertEqual(L[[3]], map(f * f, L[[1]]))
+
+        b = bulk(f)
+        self.assertEqual(2, b(1))
+        self.assertIn((int,), b.known)
+        self.assertEqual(3, b(2))
+        with self.assertRaises(te): b(1.0)
+        with self.assertRaises(te): map(f, L[1, 2, 3.0])[2]
+        with self.assertRaises(te): map(g, L[1, 2, 3, 4])[3]
+        self.assertIs(len, bulk(len))
+        with typecheck("off"):
+            self.assertIs(f, bulk(f))
+
+    def test_typeof_dispatch(self):
+        class Thing(object): pass
+        class Pair(tuple): pass
+
+        self.assertIs(__typeof_constants__[int], typeof(1))
+        self.assertIs(typeof(1), typeof(2))
+        self.assertIs(typeof(None), typeof(None))
+        self.assertIs(typeof(len), typeof(lambda x: x))
+
+        self.assertNotIn(Thing, __typeof_constants__)
+        self.assertEqual(TypeOperator(Thing, []), typeof(Thing()))
+        self.assertIs(typeof(Thing()), __typeof_constants__[Thing])
+
+        self.assertEqual(Tuple([typeof(1), typeof("a")]), typeof(Pair((1, "a"))))
+        self.assertIn(Pair, __typeof_handlers__)
+        self.assertEqual(typeof(Just(1)), typeof(Just(2)))
+        self.assertNotEqual(typeof(Just(1)), typeof(Just("a")))
+        self.assertIn(type(Just(1)), __typeof_handlers__)
+
+    def test_threads(self):
+        """Typed calls and pattern matching from many threads at once"""
+        ident = (lambda x: x) ** (H/ "a" >> "a")
+        pair = (lambda x, y: (x, y)) ** (H/ "a" >> "b" >> ("a", "b"))
+        add = (lambda x, y: x + y) ** (H/ int >> int >> int)
+        nthreads, rounds = 8, 200
+
+        def compute(n):
+            results = []
+            for i in range(rounds):
+                results.append(ident(n))
+                results.append(ident(Just(str(n))))
+                results.append(pair(n)(L[[i]]))
+                results.append(add(n, i))
+                try:
+                    add(n, str(i))
+                    results.append("typecheck skipped")
+                except TypeError:
+                    results.append(TypeError)
+                results.append(str(typeof(ident)))
+                results.append(~(caseof(Just(i))
+                                   | m(Just(m.x)) >> p.x
+                                   | m(Nothing)   >> -1))
+            return results
+
+        barrier = threading.Barrier(nthreads)
+        found = [None] * nthreads
+        def work(n):
+            barrier.wait()
+            try:
+                found[n] = compute(n)
+            except BaseException as e:
+                found[n] = e
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=work, args=(n,))
+                       for n in range(nthreads)]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        # every thread gets exactly what it would running on its own
+        expected = [compute(n) for n in range(nthreads)]
+        self.assertEqual(expected, found)
+        self.assertEqual([Just("3"), (3, L[[0]]), 3, TypeError, "(a -> a)", 0],
+                         expected[3][1:7])
+
     def test_match(self):
         match_only = lambda v, p: pattern_match(v, p)[0]
         pb = PatternMatchBind
@@ -1243,6 +1776,61 @@ class TestTypeclass(unittest.TestCase):
         from hask.Prelude import show
         self.assertEqual("example()", show(example()))
 
+    def test_dispatch(self):
+        from hask.Prelude import show, fmap
+
+        class Base(object): pass
+        class Derived(Base): pass
+        class Int(int): pass
+
+        with self.assertRaises(te): Show[Base()]
+        instance(Show, Base).where(show=lambda x: type(x).__name__)
+        self.assertEqual("Derived", show(Derived()))
+        self.assertIs(Show[Base()], Show.__dispatch__[Derived])
+
+        # adding an instance invalidates the cached dispatch
+        instance(Show, Derived).where(show=lambda x: "derived")
+        self.assertNotIn(Derived, Show.__dispatch__)
+        self.assertEqual("derived", show(Derived()))
+        self.assertEqual("Base", show(Base()))
+
+        self.assertEqual("3", show(Int(3)))
+        self.assertIs(Num[1], Num[Int(2)])
+
+        # has_instance agrees with dispatch about inherited instances
+        class Sub(Base): pass
+        class Other(object): pass
+        self.assertTrue(has_instance(Sub, Show))
+        self.assertTrue(has_instance(Int, Num))
+        self.assertTrue(has_instance(Int, Show))
+        self.assertFalse(has_instance(Other, Show))
+        self.assertFalse(has_instance(Int(1), Num))
+        self.assertIs(Show[Just(1)], Show[Nothing])
+        self.assertIs(Show[L[1, 2]], Show[L[[]]])
+
+        f = (lambda x: x + 1) ** (H/ int >> int)
+        g = (lambda x: x * 2) ** (H/ int >> int)
+        self.assertEqual(7, fmap(f, g)(3))
+
+    def test_specialize(self):
+        from hask.Prelude import negate, show
+        from hask.lang import dispatch
+
+        class Base(object): pass
+
+        self.assertEqual(-3, negate(3))
+        self.assertIn((int, "negate"), Num.__specialized__)
+        self.assertEqual(-2.5, negate(2.5))
+        self.assertEqual("1", show(1))
+
+        instance(Show, Base).where(show=lambda x: "base")
+        self.assertNotIn((int, "show"), Show.__specialized__)
+        self.assertEqual("base", show(Base()))
+        self.assertEqual("1", show(1))
+
+        with self.assertRaises(te): dispatch(Show, "show")(lambda x: x)
+        with self.assertRaises(te): negate("a")
+
 
 
 class TestOrdering(unittest.TestCase):
@@ -1663,6 +2251,340 @@ class TestList(unittest.TestCase):
         self.assertFalse(has_instance(List, Typeclass))
         self.assertFalse(has_instance(List, Num))
 
+    def test_cons_sharing(self):
+        xs = L[[]]
+        for i in range(1000):
+            xs = i ^ xs
+        self.assertEqual(1000, len(xs))
+        self.assertEqual(L[999, 998, 997], xs[:3])
+        self.assertEqual(0, xs[-1])
+
+        # consing onto a List that was already consed onto copies its cells
+        a = 1 ^ L[[0]]
+        b, c = 2 ^ a, 3 ^ a
+        self.assertEqual(L[2, 1, 0], b)
+        self.assertEqual(L[3, 1, 0], c)
+        self.assertEqual(L[1, 0], a)
+        self.assertEqual(L[4, 1, 0], 4 ^ b[1:])
+        with self.assertRaises(te): "a" ^ a
+
+        # suffixes share evaluation with the List they were taken from
+        ys = L[iter(range(5))]
+        zs = ys[2:]
+        self.assertEqual(3, zs[1])
+        self.assertEqual(L[0, 1, 2, 3, 4], ys)
+        self.assertEqual(L[2, 3, 4], zs)
+        self.assertEqual(L[[]], ys[7:])
+        self.assertEqual(L[0, 1, 2], (0 ^ L[1, ...])[:3])
+        self.assertEqual(L[2, 3], (0 ^ (1 ^ L[2, ..., 3]))[2:])
+
+    def test_slice_views(self):
+        from hask.Data.List import take, drop, splitAt, inits, tails
+
+        pulled = []
+        def source(n):
+            for i in range(n):
+                pulled.append(i)
+                yield i
+
+        # slices of the evaluated part of a List only evaluate what they need
+        xs = L[source(10)]
+        ys = xs[2:5]
+        self.assertEqual(5, len(pulled))
+        self.assertEqual(L[2, 3, 4], ys)
+        self.assertEqual(3, len(ys))
+        self.assertEqual(4, ys[-1])
+        with self.assertRaises(IndexError): ys[3]
+        self.assertEqual(L[3, 4], ys[1:])
+        self.assertEqual(L[[3]], ys[1:2])
+        self.assertEqual(L[[]], ys[3:])
+        self.assertEqual(L[1, 2, 3, 4], 1 ^ ys)
+        self.assertEqual(L[[]], xs[4:2])
+        self.assertEqual(5, len(pulled))
+        self.assertEqual(L[2, 3, 4, 5, 6], ys + xs[5:7])
+        self.assertEqual(7, len(pulled))
+        self.assertEqual(L[0, ..., 9], xs[:20])
+
+        zs = L[1, ..., 5]
+        self.assertEqual(L[1, 2], take(2, zs))
+        self.assertEqual(L[4, 5], drop(3, zs))
+        self.assertEqual((L[1, 2], L[3, 4, 5]), splitAt(2, zs))
+        self.assertEqual(L[L[[]], L[[1]], L[1, 2]], inits(L[1, 2]))
+        self.assertEqual(L[L[1, 2], L[[2]], L[[]]], tails(L[1, 2]))
+        self.assertEqual(15, sum(len(y) for y in inits(zs)))
+
+    def test_concat(self):
+        # a List being concatenated can still be evaluated independently
+        xs = L[iter([1, 2, 3])]
+        xs[0]
+        ys = xs + L[4, 5]
+        self.assertEqual(3, xs[2])
+        self.assertEqual(L[1, ..., 5], ys)
+        self.assertEqual(L[1, 2, 3, 1, 2, 3], xs + xs)
+
+        # long runs of concatenations, evaluated or not, do not nest
+        ys = L[[0]]
+        zs = L[[0]]
+        for i in range(3000):
+            ys = ys + L[[i]]
+            zs = L[iter([i])] + zs
+            zs[0]
+        self.assertEqual(3001, len(ys))
+        self.assertEqual(2999, ys[-1])
+        self.assertEqual(3001, len(zs))
+        self.assertEqual(2999, zs[0])
+        self.assertEqual(0, zs[2999])
+
+        # appending to either end while evaluating takes linear time (a
+        # quadratic build would take 64 times as long for 8 times as many)
+        import time
+        def build(n):
+            start = time.perf_counter()
+            ys = L[[0]]
+            for i in range(n):
+                ys = L[iter([i])] + ys + L[iter([i])]
+                ys[1]
+            return time.perf_counter() - start
+        small = min(build(500) for _ in range(3))
+        large = min(build(4000) for _ in range(2))
+        self.assertLess(large / small, 24)
+
+        ws = L[iter([1, 2])] + L[iter([3, 4])]
+        ws[2]
+        self.assertEqual(L[1, 2, 3, 4, 1, 2, 3, 4], ws + ws)
+        self.assertEqual(L[2, 3, 4, 9], ws[1:] + L[[9]])
+        self.assertEqual(L[1, 2, 3], L[[]] + L[1, 2, 3] + L[[]])
+
+        with self.assertRaises(te): L["a", "b"] + L[1, 2]
+        with self.assertRaises(te): L[iter([1])] + L["a", "b"]
+
+    def test_hash_index(self):
+        from hask.Data.List import elem, notElem, elemIndex, lookup
+
+        # elements are compared by value, not identity
+        words = L[[str(i) for i in range(100)] + ["1"]]
+        self.assertTrue(elem("9" + "9", words))
+        self.assertTrue("1" + "0" in words)
+        self.assertTrue(notElem("100", words))
+        self.assertEqual(Just(1), elemIndex("1", words))
+        self.assertEqual(Nothing, elemIndex("x", words))
+        self.assertTrue(elem(2 ** 40, L[[2 ** 40 + i for i in range(3)]]))
+
+        pairs = L[[(i % 50, i) for i in range(100)]]
+        self.assertEqual(Just(7), lookup(7, pairs))
+        self.assertEqual(Nothing, lookup(50, pairs))
+        self.assertEqual(Just((1, 2)), lookup((1, 2), L[[((1, 2), (1, 2))]]))
+
+        # NaN is not equal to itself
+        nan = float("nan")
+        self.assertFalse(elem(nan, L[[nan] * 40]))
+        self.assertEqual(Nothing, elemIndex(nan, L[[nan] * 40]))
+
+        # Lists that are not fully evaluated are searched lazily
+        self.assertTrue(elem(1000, L[0, ...]))
+        self.assertEqual(Just(5), elemIndex(5, L[iter(range(10))]))
+        self.assertEqual(Just("b"), lookup(2, L[iter([(1, "a"), (2, "b")])]))
+        self.assertFalse(elem(3, L[[]]))
+
+    def test_chunks(self):
+        pulled = []
+        def source(n):
+            for i in range(n):
+                pulled.append(i)
+                yield i
+
+        xs = L[source(100)]
+        self.assertEqual(3, xs[3])
+        self.assertEqual(4, len(pulled))
+        self.assertEqual(L[0, 1], xs[:2])
+        self.assertEqual(4, len(pulled))
+
+        del pulled[:]
+        ys = List(tail=source(100), chunk=10)
+        self.assertEqual(0, ys[0])
+        self.assertEqual(10, len(pulled))
+        self.assertEqual(50, ys[50])
+        self.assertEqual(51, len(pulled))
+        self.assertEqual(100, len(ys))
+        self.assertEqual(1234567, L[1, ...][1234566])
+
+        # unbounded sequences are evaluated only as far as they are needed,
+        # since an Enum may run out of successors
+        self.assertEqual("L[1 ...]", str(L[1, ...]))
+        Tri, T1, T2 = data.Tri == d.T1 | d.T2 & deriving(Show, Eq)
+        instance(Enum, Tri).where(fromEnum=lambda x: [T1, T2].index(x),
+                                  toEnum=lambda i: [T1, T2][i])
+        self.assertEqual(T1, L[T1, ...][0])
+        self.assertEqual(T2, L[T1, ...][1])
+
+        zs = List(tail=iter([1, 2, "a", 4]), chunk=4)
+        with self.assertRaises(te): zs[1]
+        with self.assertRaises(ve): List(chunk=0)
+
+        # a block with an element of the wrong type keeps the others, and only
+        # that element is lost
+        self.assertEqual(L[1, 2, 4], zs)
+        ws = L[("a" if i == 3 else i for i in range(10))]
+        with self.assertRaises(te): ws[5]
+        self.assertEqual(0, ws[0])
+        self.assertEqual(4, ws[3])
+        self.assertEqual(9, len(ws))
+        vs = List(tail=iter([1, 2, "a"]))
+        with self.assertRaises(te): len(vs)
+        self.assertEqual(L[1, 2], vs)
+
+    def test_window(self):
+        from hask.Data.List import map, filter
+        from hask.Prelude import fmap
+
+        xs = List(tail=iter(range(1000)), window=3)
+        self.assertEqual(10, xs[10])
+        self.assertEqual(8, xs[8])
+        with self.assertRaises(IndexError): xs[7]
+        self.assertEqual(L[11, 12], xs[11:][:2])
+        with self.assertRaises(IndexError): list(xs)
+        with self.assertRaises(te): len(xs)
+        self.assertEqual(999, xs[-1])
+        self.assertEqual(1000, len(xs))
+        self.assertEqual("L[..., 997, 998, 999]", str(xs))
+
+        # Python's builtins iterate over a List with a window from its start
+        window = lambda: List(tail=iter(range(5)), window=2)
+        self.assertEqual([0, 1, 2, 3, 4], list(window()))
+        self.assertEqual((1, 2, 3, 4, 5), tuple(x + 1 for x in window()))
+        self.assertEqual([4, 3, 2, 1, 0], sorted(window(), reverse=True))
+        self.assertEqual([9, 0, 1, 2, 3, 4], list(9 ^ window()))
+        self.assertEqual([0, 1, 2, 3, 4, 1], list(window() + L[[1]]))
+
+        ys = List(tail=iter(range(1000)), window=2)
+        even = (lambda x: x % 2 == 0) ** (H/ int >> bool)
+        zs = filter(even, map(_ * 3, ys))
+        self.assertEqual(sum(range(0, 3000, 6)), sum(iter(zs)))
+        self.assertEqual("L[..., 2988, 2994]", str(zs))
+        self.assertEqual(4, fmap(_ + 1, List(head=[1, 2, 3], window=1))[2])
+        with self.assertRaises(ve): List(window=0)
+
+        # prefixes and forward slices stream, as do folds and length
+        from hask.Data.List import take, length, foldr
+        window = lambda: List(tail=iter(range(100)), window=4)
+        self.assertEqual([0, 1, 2, 3, 4], list(take(5, window())))
+        self.assertEqual([2, 3, 4], list(window()[2:5]))
+        self.assertEqual([10, 30, 50], list(window()[10:60:20]))
+        self.assertEqual(4, take(5, window()).window)
+        self.assertEqual([0, 1, 2], list(take(3, List(tail=itertools.count(),
+                                                      window=2))))
+        self.assertEqual(100, length(window()))
+        self.assertEqual(sum(range(100)), foldr(_ + _, 0, window()))
+
+    def test_compact(self):
+        from hask.Data.List import sum, maximum, minimum, elem
+
+        xs = L[1, ..., 1000]
+        self.assertEqual(500500, sum(xs))
+        self.assertEqual(1000, maximum(xs))
+        self.assertEqual(1, minimum(xs))
+        self.assertTrue(elem(999, xs))
+        self.assertTrue(1000 in xs)
+        self.assertFalse(1001 in xs)
+        self.assertIsNotNone(xs.buffer())
+        self.assertEqual(L[11, ..., 20], xs[10:20])
+        self.assertEqual(L[991, ..., 1000], xs[990:])
+        self.assertEqual(L[[1.5, 2.5]], L[[1.5]] + L[[2.5]])
+        self.assertEqual(L[0, ..., 3], 0 ^ L[1, 2, 3])
+        self.assertEqual(L[1, 2, 3, 4], L[1, 2] + L[3, 4])
+        self.assertEqual(6.0, sum(L[1.5, 2.0, 2.5]))
+        self.assertIsNone(L[1, 2**70].buffer())
+        self.assertIsNone(L["a", "b"].buffer())
+        self.assertIsNone(L[True, False].buffer())
+
+        ys = List(tail=iter([1, 2, 3]), compact=True)
+        self.assertEqual(L[1, 2, 3], ys)
+        self.assertEqual(6, sum(ys))
+        with self.assertRaises(te): List(head=["a"], compact=True)
+        with self.assertRaises(OverflowError): List(head=[2**70], compact=True)
+        with self.assertRaises(te): len(List(tail=iter([1, 2.0]), compact=True))
+
+        # a view taken before the List is evaluated shares its array
+        xs = List(tail=iter(range(10)), compact=True)
+        ys = xs[0:]
+        self.assertEqual(2, xs[2])
+        self.assertEqual(0, ys[0])
+        self.assertEqual(L[0, ..., 9], ys)
+        self.assertEqual(L[0, ..., 9], xs)
+        self.assertEqual(L[3, ..., 9], List(tail=iter(range(10)),
+                                            compact=True)[3:])
+
+    def test_numpy_backend(self):
+        from hask import get_backend, set_backend
+        from hask.lang import backend
+        from hask.Data.List import map, zipWith, filter, foldl, scanl
+        from hask.Data.List import sum, product, sort
+
+        with self.assertRaises(ve): set_backend("fortran")
+        if backend.numpy is None:
+            with self.assertRaises(ImportError): set_backend("numpy")
+            self.skipTest("NumPy is not installed")
+
+        xs, ys = L[-5, ..., 5], L[[1.5, -2.25, 0.5]]
+        calls = [lambda: map(_ * 2, xs), lambda: map(10 // _, L[1, ..., 5]),
+                 lambda: map(_ > 0, xs), lambda: map(_ * 4, L[[2**62]]),
+                 lambda: map(_ / 4, ys), lambda: map(_ ** 2, xs),
+                 lambda: zipWith(_ - _, xs, L[1, ..., 4]),
+                 lambda: filter(_ != 0.5, ys), lambda: filter(_ > 0, xs),
+                 lambda: foldl(_ * _, 1, L[1, ..., 30]),
+                 lambda: foldl(_ - _, 0, xs), lambda: scanl(_ + _, 0, xs),
+                 lambda: sum(ys), lambda: product(xs), lambda: sort(ys)]
+        # results as Python values and types, to compare them exactly
+        run = lambda f: [(x, type(x)) for x in f()] \
+            if isinstance(f(), List) else (f(), type(f()))
+
+        self.addCleanup(set_backend, get_backend())
+        set_backend("python")
+        expected = [run(f) for f in calls]
+        set_backend("numpy")
+        self.assertEqual("numpy", get_backend())
+        self.assertEqual(expected, [run(f) for f in calls])
+        with self.assertRaises(ZeroDivisionError): list(map(1 // _, xs))
+
+        # NaN and infinities give the same results, and no warnings, as in
+        # Python
+        zs = L[[math.inf, -math.inf, 0.5]]
+        specials = [lambda: map(_ * 0, zs), lambda: map(_ - math.inf, zs),
+                    lambda: zipWith(_ + _, zs, zs), lambda: sum(zs),
+                    lambda: scanl(_ * _, 0.5, zs), lambda: map(_ ** 1e6, zs)]
+        show = lambda f: str(list(f()) if isinstance(f(), List) else f())
+        set_backend("python")
+        expected = [show(f) for f in specials]
+        set_backend("numpy")
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertEqual(expected, [show(f) for f in specials])
+
+    def test_element_types(self):
+        class Int(int): pass
+
+        self.assertEqual(3, len(L[1, 2, 3]))
+        with self.assertRaises(te): L[1, 2, "a"]
+        with self.assertRaises(te): L[1, True]
+        with self.assertRaises(te): L[1, Int(2)]
+        with self.assertRaises(te): L[1., 2]
+        with self.assertRaises(te): L[Just(1), Just("a")]
+        with self.assertRaises(te): L[L[[1]], L[["a"]]]
+        self.assertEqual(L[Int(1), Int(2)], L[Int(1), Int(2)])
+        self.assertEqual(2, len(L[Just(1), Nothing]))
+        self.assertEqual(2, len(L[L[[]], L[[1]]]))
+
+        lazy = L[(x for x in (1, 2, "a"))]
+        self.assertEqual(2, lazy[1])
+        with self.assertRaises(te): lazy[2]
+        with self.assertRaises(te): L[(x for x in (True, 1))][1]
+        with self.assertRaises(te): L[(x for x in (Just(1), Just(1.)))][1]
+        self.assertEqual(Nothing, L[(x for x in (Just(1), Nothing))][1])
+
+        with self.assertRaises(te): True in L[1, 2]
+        with self.assertRaises(te): True in L[[]] + L[1, 2]
+        with self.assertRaises(te): L[Just(1)].count(Just("a"))
+
     def test_eq(self):
         self.assertEqual(L[[]], L[[]])
         self.assertEqual(L[[1, 2]], L[[1, 2]])
@@ -2026,6 +2948,8 @@ class TestDataList(unittest.TestCase):
 
         plus_one = (lambda x: x + 1) ** (H/ int >> int)
         self.assertEqual(iterate(plus_one, 0)[:10], L[range(10)])
+        self.assertEqual(L[0, 1, 3, 6], scanl(_ + _, 0, L[1, 2, 3]))
+        self.assertEqual(L[[0]], scanl(_ + _, 0, L[[]]))
         self.assertEqual(iterate(_ + 1, 0)[:10], L[range(10)])
 
         uf = (lambda x: Nothing if x > 5 else Just((x+1, x+1))) ** \
@@ -2267,7 +3191,7 @@ class TestDataChar(unittest.TestCase):
 
         with self.assertRaises(te): ord(97)
         with self.assertRaises(te): chr("a")
-        with self.assertRaises(te): chr * chr
+        with self.assertRaises(te): (chr * chr)(97)
 
         for i in range(256):
             self.assertEqual(i, ord * chr % i)
@@ -2388,6 +3312,78 @@ class TestPython(unittest.TestCase):
         with self.assertRaises(te): delattr(list)(len)
 
 
+class TestCheck(unittest.TestCase):
+
+    source = """
+from hask import H, sig, t, Maybe, Just, Nothing
+
+@sig(H/ int >> int >> int)
+def add(x, y):
+    return x + y
+
+@sig(H/ int >> t(Maybe, int))
+def safe(x):
+    y = add(x, 1)
+    return Just(y) if x else Nothing
+
+pair = (lambda x: (x, "a")) ** (H/ int >> (int, str))
+
+@sig(H/ int >> str)
+def bad_return(x):
+    return add(x, 1)
+
+@sig(H/ str >> int)
+def bad_argument(s):
+    return add(s, 1)
+
+@sig(H/ "a" >> "a")
+def not_polymorphic(x):
+    return "a"
+
+@sig(H/ int >> "b")
+def bad_lambda(x):
+    return lambda y: add(y, "a")
+
+if __name__ == "__main__":
+    add("never", "run")
+"""
+
+    def check(self, source):
+        from hask.check import check_file
+        import tempfile, os
+        with tempfile.NamedTemporaryFile("w", suffix=".py",
+                                         delete=False) as f:
+            f.write(source)
+        try:
+            return check_file(f.name), f.name
+        finally:
+            os.unlink(f.name)
+
+    def test_check(self):
+        checker, path = self.check(self.source)
+        self.assertEqual(7, checker.checked)
+        self.assertEqual([17, 21, 24, 29, 32],
+                         [e.line for e in checker.errors])
+        self.assertIn("str != int", checker.errors[0].message)
+        self.assertIn("less polymorphic", checker.errors[2].message)
+        self.assertTrue(str(checker.errors[0]).startswith(path + ":17: "))
+
+        checker, _ = self.check("from hask import H, sig\n"
+                                "x = sig(H/ int >> int)(len)(1.0)\n")
+        self.assertEqual(2, checker.errors[0].line)
+        self.assertIn("Cannot import", checker.errors[0].message)
+
+    def test_main(self):
+        from hask.check import main
+        out = io.StringIO()
+        stdout, sys.stdout = sys.stdout, out
+        try:
+            self.assertEqual(0, main(["hask.Data.Maybe"]))
+        finally:
+            sys.stdout = stdout
+        self.assertIn("0 errors", out.getvalue())
+
+
 class Test_README_Examples(unittest.TestCase):
     """Make sure the README examples are all working"""
 